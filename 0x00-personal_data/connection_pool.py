@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""A module for pooling database connections."""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+
+
+def ping(connection: Any) -> bool:
+    """Checks that a connection is still usable.
+
+    Uses the driver's ping() when there is one (mysql.connector), otherwise
+    runs a trivial query (sqlite3 and other DB-API connections).
+    """
+    try:
+        if hasattr(connection, "ping"):
+            connection.ping(reconnect=False)
+        else:
+            cursor = connection.cursor()
+            try:
+                cursor.execute("SELECT 1")
+                cursor.fetchall()
+            finally:
+                cursor.close()
+        return True
+    except Exception:
+        return False
+
+
+class PoolExhausted(Exception):
+    """Raised when no connection becomes available before the timeout."""
+
+
+class ConnectionPool:
+    """Thread-safe pool of reusable DB-API connections.
+
+    At most `size` connections are open at once. Idle connections are kept
+    most-recently-used first; those idle for longer than `idle_timeout`
+    seconds are closed on the next checkout, and every connection handed
+    out is first checked with `health_check`.
+    """
+
+    def __init__(self, connect: Callable[[], Any], size: int = 5,
+                 idle_timeout: float = 300.0, timeout: Optional[float] = 30.0,
+                 health_check: Callable[[Any], bool] = ping):
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        self._connect = connect
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self._health_check = health_check
+        self._idle = deque()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+        self._closed = False
+
+    def acquire(self) -> Any:
+        """Checks out a healthy connection, opening one if none is idle."""
+        if self._closed:
+            raise RuntimeError("pool is closed")
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolExhausted(
+                "no connection available after {}s".format(self.timeout))
+        try:
+            while True:
+                connection = self._pop_idle()
+                if connection is None:
+                    return self._connect()
+                if self._health_check(connection):
+                    return connection
+                self._discard(connection)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, connection: Any) -> None:
+        """Returns a connection to the pool."""
+        try:
+            if self._closed:
+                self._discard(connection)
+            else:
+                with self._lock:
+                    self._idle.append((connection, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """Context manager that checks a connection out and back in."""
+        connection = self.acquire()
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+
+    def idle_count(self) -> int:
+        """Returns the number of idle connections held by the pool."""
+        with self._lock:
+            return len(self._idle)
+
+    def evict_idle(self) -> int:
+        """Closes connections idle for longer than idle_timeout."""
+        deadline = time.monotonic() - self.idle_timeout
+        expired = []
+        with self._lock:
+            # The oldest connections sit at the left end
+            while self._idle and self._idle[0][1] < deadline:
+                expired.append(self._idle.popleft()[0])
+        for connection in expired:
+            self._discard(connection)
+        return len(expired)
+
+    def close(self) -> None:
+        """Closes every idle connection and refuses further checkouts."""
+        self._closed = True
+        with self._lock:
+            idle = [connection for connection, _ in self._idle]
+            self._idle.clear()
+        for connection in idle:
+            self._discard(connection)
+
+    def _pop_idle(self) -> Any:
+        """Returns the most recently used idle connection, or None."""
+        self.evict_idle()
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()[0]
+        return None
+
+    @staticmethod
+    def _discard(connection: Any) -> None:
+        """Closes a connection, ignoring errors from dead sockets."""
+        try:
+            connection.close()
+        except Exception:
+            pass
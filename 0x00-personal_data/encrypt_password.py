@@ -1,12 +1,66 @@
 #!/usr/bin/env python3
 """A module for encrypting passwords."""
 import bcrypt
+import functools
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, Optional, Tuple
+
+# bcrypt's own default cost factor
+DEFAULT_ROUNDS = 12
+
+
+def calibrate_rounds(target_ms: float, min_rounds: int = 4,
+                     max_rounds: int = 16) -> int:
+    """Benchmark bcrypt on this machine and return the highest cost factor
+    whose hash time stays under target_ms (never below min_rounds)."""
+    best = min_rounds
+    for rounds in range(min_rounds, max_rounds + 1):
+        start = time.perf_counter()
+        bcrypt.hashpw(b"calibration", bcrypt.gensalt(rounds))
+        if (time.perf_counter() - start) * 1000 > target_ms:
+            break
+        best = rounds
+    return best
+
+
+@functools.lru_cache(maxsize=None)
+def default_rounds() -> int:
+    """Cost factor used by hash_password.
+
+    BCRYPT_ROUNDS pins it, BCRYPT_TARGET_MS calibrates it once per process,
+    otherwise bcrypt's default is kept.
+    """
+    if os.getenv("BCRYPT_ROUNDS"):
+        return int(os.getenv("BCRYPT_ROUNDS"))
+    if os.getenv("BCRYPT_TARGET_MS"):
+        return calibrate_rounds(float(os.getenv("BCRYPT_TARGET_MS")))
+    return DEFAULT_ROUNDS
+
+
+def hash_rounds(hashed_password: bytes) -> int:
+    """Return the cost factor stored in a bcrypt hash ($2b$<cost>$...)."""
+    if isinstance(hashed_password, str):
+        hashed_password = hashed_password.encode('utf-8')
+    return int(hashed_password.split(b'$')[2])
+
+
+def needs_rehash(hashed_password: bytes,
+                 rounds: Optional[int] = None) -> bool:
+    """Check whether a hash was made with a lower cost than the current one.
+
+    Stronger hashes are kept, so processes that calibrated to slightly
+    different costs do not keep rehashing each other's passwords.
+    """
+    return hash_rounds(hashed_password) < (rounds or default_rounds())
 
 
 def hash_password(password: str) -> bytes:
     """Hash a password using bcrypt with a randomly generated salt."""
     password_bytes = password.encode('utf-8')
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(default_rounds())
     hashed = bcrypt.hashpw(password_bytes, salt)
     return hashed
 
@@ -15,3 +69,54 @@ def is_valid(hashed_password: bytes, password: str) -> bool:
     """Check if a hashed password matches the given plain-text password."""
     password_bytes = password.encode('utf-8')
     return bcrypt.checkpw(password_bytes, hashed_password)
+
+
+def _hash_with_rounds(rounds: int, password: str) -> bytes:
+    """Hash one password with an explicit cost factor."""
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds))
+
+
+def _verify_pair(pair: Tuple[bytes, str]) -> bool:
+    """Check one (hashed_password, password) pair."""
+    hashed_password, password = pair
+    return is_valid(hashed_password, password)
+
+
+def _ordered_map(function: Callable, items: Iterable, workers: Optional[int],
+                 use_processes: bool) -> Iterator:
+    """Map function over items on a pool, yielding results in input order.
+
+    At most a few tasks per worker are in flight, so items are consumed
+    lazily and results stream back while the input is still being read.
+    """
+    workers = workers or os.cpu_count() or 1
+    pool_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    with pool_class(max_workers=workers) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(function, item))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def hash_passwords_bulk(passwords: Iterable[str], rounds: Optional[int] = None,
+                        workers: Optional[int] = None,
+                        use_processes: bool = False) -> Iterator[bytes]:
+    """Hash many passwords in parallel, yielding hashes in input order.
+
+    bcrypt releases the GIL while hashing, so the default thread pool
+    already uses every core; use_processes=True runs on a process pool.
+    rounds defaults to default_rounds().
+    """
+    function = functools.partial(_hash_with_rounds, rounds or default_rounds())
+    return _ordered_map(function, passwords, workers, use_processes)
+
+
+def verify_passwords_bulk(pairs: Iterable[Tuple[bytes, str]],
+                          workers: Optional[int] = None,
+                          use_processes: bool = False) -> Iterator[bool]:
+    """Check many (hashed_password, password) pairs in parallel,
+    yielding one boolean per pair in input order."""
+    return _ordered_map(_verify_pair, pairs, workers, use_processes)
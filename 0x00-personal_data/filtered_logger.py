@@ -2,33 +2,84 @@
 """A module for filtering logs."""
 import os
 import re
+import sys
+import queue
 import logging
+import functools
+import threading
 import mysql.connector
-from typing import List, Tuple, Optional
+from connection_pool import ConnectionPool
+from typing import Iterable, Iterator, List, Tuple, Optional, Pattern, Sequence
 
 
 # Define patterns for extracting and replacing PII data
 patterns = {
-    'extract': lambda fields, sep: r'(?P<field>{})=[^{}]*'.format('|'.join(fields), sep),
+    'extract': lambda fields, sep: r'(?P<field>{})=[^{}]*'.format(
+        '|'.join(fields), sep),
     'replace': lambda redaction: r'\g<field>={}'.format(redaction),
 }
 
 # Fields considered to contain Personally Identifiable Information (PII)
 PII_FIELDS = ("name", "email", "phone", "ssn", "password")
 
+# Maximum number of distinct (fields, separator, redaction) patterns kept
+REDACTION_CACHE_SIZE = 128
 
-def filter_datum(fields: List[str], redaction: str, message: str, separator: str) -> str:
-    """Filters a log line to redact sensitive information."""
-    extract_pattern = patterns["extract"](fields, separator)
+# Behaviours of AsyncRedactingHandler when its queue is full
+OVERFLOW_POLICIES = ("block", "drop", "sample")
+
+# Number of rows pulled from the server per fetchmany() call
+FETCH_BATCH_SIZE = int(os.getenv("PERSONAL_DATA_BATCH_SIZE", "1000"))
+
+
+@functools.lru_cache(maxsize=REDACTION_CACHE_SIZE)
+def _compile_redaction(fields: Tuple[str, ...], separator: str,
+                       redaction: str) -> Tuple[Pattern, str]:
+    """Compiles the extract pattern and builds the replacement template
+    for a combination of fields, separator and redaction string."""
+    extract_pattern = re.compile(patterns["extract"](fields, separator))
     replace_pattern = patterns["replace"](redaction)
-    return re.sub(extract_pattern, replace_pattern, message)
+    return extract_pattern, replace_pattern
+
+
+class Redactor:
+    """Redacts PII fields from log lines with a precompiled pattern."""
+
+    def __init__(self, fields: Sequence[str], redaction: str = "***",
+                 separator: str = ";"):
+        self.fields = tuple(fields)
+        self.redaction = redaction
+        self.separator = separator
+        self._pattern, self._replacement = _compile_redaction(
+            self.fields, separator, redaction)
+
+    def redact(self, message: str) -> str:
+        """Returns the message with every configured field redacted."""
+        return self._pattern.sub(self._replacement, message)
+
 
+def filter_datum(fields: List[str], redaction: str, message: str,
+                 separator: str) -> str:
+    """Filters a log line to redact sensitive information."""
+    extract_pattern, replace_pattern = _compile_redaction(
+        tuple(fields), separator, redaction)
+    return extract_pattern.sub(replace_pattern, message)
+
+
+def get_logger(asynchronous: bool = False, queue_size: int = 10000,
+               overflow: str = "block") -> logging.Logger:
+    """Creates and configures a logger for user data.
 
-def get_logger() -> logging.Logger:
-    """Creates and configures a logger for user data."""
+    With asynchronous=True records are queued and redacted by a background
+    AsyncRedactingHandler instead of on the calling thread.
+    """
     logger = logging.getLogger("user_data")
-    stream_handler = logging.StreamHandler()
-    stream_handler.setFormatter(RedactingFormatter(PII_FIELDS))
+    if asynchronous:
+        stream_handler = AsyncRedactingHandler(
+            PII_FIELDS, queue_size=queue_size, overflow=overflow)
+    else:
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(RedactingFormatter(PII_FIELDS))
     logger.setLevel(logging.INFO)
     logger.propagate = False
     logger.addHandler(stream_handler)
@@ -38,40 +89,85 @@ def get_logger() -> logging.Logger:
 def get_db() -> mysql.connector.connection.MySQLConnection:
     """Creates a connector to the database using environment variables."""
     db_host = os.getenv("PERSONAL_DATA_DB_HOST", "localhost")
+    db_port = int(os.getenv("PERSONAL_DATA_DB_PORT", "3306"))
     db_name = os.getenv("PERSONAL_DATA_DB_NAME", "")
     db_user = os.getenv("PERSONAL_DATA_DB_USERNAME", "root")
     db_pwd = os.getenv("PERSONAL_DATA_DB_PASSWORD", "")
-    
+
     return mysql.connector.connect(
         host=db_host,
-        port=3306,
+        port=db_port,
         user=db_user,
         password=db_pwd,
         database=db_name,
     )
 
 
-def main():
+_db_pool: Optional[ConnectionPool] = None
+
+
+def get_db_pool() -> ConnectionPool:
+    """Returns the shared pool of get_db() connections, creating it once.
+
+    Pool settings come from PERSONAL_DATA_DB_POOL_SIZE and
+    PERSONAL_DATA_DB_POOL_IDLE_TIMEOUT (seconds).
+    """
+    global _db_pool
+    if _db_pool is None:
+        _db_pool = ConnectionPool(
+            get_db,
+            size=int(os.getenv("PERSONAL_DATA_DB_POOL_SIZE", "5")),
+            idle_timeout=float(
+                os.getenv("PERSONAL_DATA_DB_POOL_IDLE_TIMEOUT", "300")),
+        )
+    return _db_pool
+
+
+def iter_rows(cursor, batch_size: int = FETCH_BATCH_SIZE) -> Iterator[tuple]:
+    """Yields rows from an executed cursor, fetching them in batches."""
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield from rows
+
+
+def iter_records(rows: Iterable[tuple],
+                 columns: List[str]) -> Iterator[logging.LogRecord]:
+    """Yields a user_data LogRecord for each row."""
+    for row in rows:
+        record = "; ".join(f"{col}={val}" for col, val in zip(columns, row))
+        yield logging.LogRecord("user_data", logging.INFO, None, None,
+                                record, None, None)
+
+
+def iter_redacted_lines(cursor, columns: List[str],
+                        formatter: logging.Formatter,
+                        batch_size: int = FETCH_BATCH_SIZE) -> Iterator[str]:
+    """Yields formatted, redacted log lines for the rows of a cursor."""
+    for log_record in iter_records(iter_rows(cursor, batch_size), columns):
+        yield formatter.format(log_record)
+
+
+def main(batch_size: int = FETCH_BATCH_SIZE):
     """Logs information about user records from the database."""
     fields = "name,email,phone,ssn,password,ip,last_login,user_agent"
     columns = fields.split(',')
     query = "SELECT {} FROM users;".format(fields)
     info_logger = get_logger()
-    connection = get_db()
-    
-    with connection.cursor() as cursor:
-        cursor.execute(query)
-        rows = cursor.fetchall()
-        
-        for row in rows:
-            record = "; ".join(f"{col}={val}" for col, val in zip(columns, row))
-            log_record = logging.LogRecord("user_data", logging.INFO, None, None, record, None, None)
-            info_logger.handle(log_record)
+
+    with get_db_pool().connection() as connection:
+        # An unbuffered cursor streams rows from the server as they are fetched
+        with connection.cursor(buffered=False) as cursor:
+            cursor.execute(query)
+            rows = iter_rows(cursor, batch_size)
+            for log_record in iter_records(rows, columns):
+                info_logger.handle(log_record)
 
 
 class RedactingFormatter(logging.Formatter):
     """Redacting Formatter class to filter PII fields in log messages."""
-    
+
     REDACTION = "***"
     FORMAT = "[HOLBERTON] %(name)s %(levelname)s %(asctime)-15s: %(message)s"
     SEPARATOR = ";"
@@ -79,11 +175,116 @@ class RedactingFormatter(logging.Formatter):
     def __init__(self, fields: List[str]):
         super().__init__(self.FORMAT)
         self.fields = fields
+        self.redactor = Redactor(fields, self.REDACTION, self.SEPARATOR)
 
     def format(self, record: logging.LogRecord) -> str:
         """Formats a LogRecord, redacting specified PII fields."""
         formatted_message = super().format(record)
-        return filter_datum(self.fields, self.REDACTION, formatted_message, self.SEPARATOR)
+        return self.redactor.redact(formatted_message)
+
+
+class AsyncRedactingHandler(logging.Handler):
+    """Handler that queues records and redacts/writes them on a worker thread.
+
+    The worker drains up to batch_size records at a time, formats them with
+    a RedactingFormatter and writes the whole batch with a single call.
+    When the queue is full, `overflow` decides what happens to new records:
+    "block" waits for room, "drop" discards them and "sample" keeps one in
+    every `sample_rate` overflowing records (blocking for it) and discards
+    the rest. Discarded records are counted in `dropped`.
+    """
+
+    _STOP = object()
+
+    def __init__(self, fields: List[str], stream=None, queue_size: int = 10000,
+                 batch_size: int = 512, overflow: str = "block",
+                 sample_rate: int = 10):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(
+                "overflow must be one of {}".format(OVERFLOW_POLICIES))
+        super().__init__()
+        self.setFormatter(RedactingFormatter(fields))
+        self.stream = stream if stream is not None else sys.stderr
+        self.terminator = "\n"
+        self.batch_size = batch_size
+        self.overflow = overflow
+        self.sample_rate = max(1, sample_rate)
+        self.dropped = 0
+        self._overflowed = 0
+        self._closed = False
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._worker = threading.Thread(target=self._drain,
+                                        name="redacting-log-writer",
+                                        daemon=True)
+        self._worker.start()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """Queues a record without formatting it."""
+        if self._closed:
+            self.dropped += 1
+            return
+        # Freeze the message so later changes to args cannot leak in
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self._on_overflow(record)
+
+    def _on_overflow(self, record: logging.LogRecord) -> None:
+        """Applies the overflow policy to a record that did not fit."""
+        if self.overflow == "block":
+            self._queue.put(record)
+            return
+        self._overflowed += 1
+        if (self.overflow == "sample"
+                and self._overflowed % self.sample_rate == 0):
+            self._queue.put(record)
+        else:
+            self.dropped += 1
+
+    def _drain(self) -> None:
+        """Worker loop: formats and writes queued records in batches."""
+        stop = False
+        while not stop:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            lines = []
+            for record in batch:
+                if record is self._STOP:
+                    stop = True
+                    continue
+                try:
+                    lines.append(self.format(record) + self.terminator)
+                except Exception:
+                    self.handleError(record)
+            if lines:
+                try:
+                    self.stream.write("".join(lines))
+                    self.stream.flush()
+                except Exception:
+                    self.handleError(batch[-1])
+            for _ in batch:
+                self._queue.task_done()
+
+    def flush(self) -> None:
+        """Blocks until every queued record has been written."""
+        if self._worker.is_alive():
+            self._queue.join()
+
+    def close(self) -> None:
+        """Writes pending records and stops the worker thread."""
+        if not self._closed:
+            self._closed = True
+            if self._worker.is_alive():
+                self._queue.put(self._STOP)
+                self._worker.join()
+        super().close()
 
 
 if __name__ == "__main__":
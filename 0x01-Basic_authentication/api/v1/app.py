@@ -8,12 +8,33 @@ from flask_cors import CORS
 from api.v1.views import app_views
 from api.v1.auth.auth import Auth
 from api.v1.auth.basic_auth import BasicAuth
+from api.v1.auth.credential_cache import CredentialCache
+from api.v1.auth.path_matcher import PathMatcher
 
 app = Flask(__name__)
 app.register_blueprint(app_views)
 CORS(app, resources={r"/api/v1/*": {"origins": "*"}})
 
 auth = BasicAuth() if getenv('AUTH_TYPE', 'auth') == 'basic_auth' else Auth()
+credential_cache = CredentialCache(
+    maxsize=int(getenv('CREDENTIAL_CACHE_SIZE', '1024')),
+    ttl=float(getenv('CREDENTIAL_CACHE_TTL', '300'))
+) if isinstance(auth, BasicAuth) else None
+
+# Paths that skip authentication, compiled once per blueprint
+app_views_excluded = [
+    '/api/v1/status/',
+    '/api/v1/unauthorized/',
+    '/api/v1/forbidden/',
+]
+excluded_paths = {
+    app_views.name: PathMatcher(app_views_excluded),
+}
+no_excluded_paths = PathMatcher()
+# Requests that fail routing (404, 405) have no blueprint, so they are
+# matched on their path alone
+unrouted_excluded_paths = PathMatcher(app_views_excluded)
+
 
 @app.before_request
 def before_request() -> None:
@@ -21,17 +42,22 @@ def before_request() -> None:
     if auth is None:
         return
 
-    excluded_paths = [
-        '/api/v1/status/',
-        '/api/v1/unauthorized/',
-        '/api/v1/forbidden/'
-    ]
-    
-    if auth.require_auth(request.path, excluded_paths):
-        if auth.authorization_header(request) is None:
+    if request.blueprint is None:
+        matcher = unrouted_excluded_paths
+    else:
+        matcher = excluded_paths.get(request.blueprint, no_excluded_paths)
+    if not matcher.match(request.path):
+        header = auth.authorization_header(request)
+        if header is None:
             abort(401)
-        if auth.current_user(request) is None:
+        if credential_cache is not None \
+                and credential_cache.get(header) is not None:
+            return
+        user = auth.current_user(request)
+        if user is None:
             abort(403)
+        if credential_cache is not None:
+            credential_cache.put(header, user)
 
 @app.errorhandler(404)
 def not_found(error) -> str:
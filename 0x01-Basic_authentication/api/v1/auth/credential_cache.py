@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+""" Module of the Basic auth credential cache
+"""
+from collections import OrderedDict
+from hashlib import sha256
+from models.user import User
+from typing import Optional, TypeVar
+import threading
+import time
+
+
+class CredentialCache():
+    """ Bounded LRU cache, with a TTL, from an Authorization header to
+    the id of the User it authenticates
+
+    Keys are SHA-256 digests of the header, so no credentials are kept.
+    Each entry also remembers the User's password hash: a hit whose User
+    was removed or has changed password is dropped and counted as a miss.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0):
+        """ Initialize the cache
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(header: str) -> str:
+        """ Digest used as the cache key of a header
+        """
+        return sha256(header.encode('utf-8')).hexdigest()
+
+    def get(self, header: str) -> Optional[TypeVar('User')]:
+        """ User cached for this Authorization header, or None
+        """
+        key = self._key(header)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                user_id, password, expires_at = entry
+                user = User.get(user_id)
+                if expires_at > time.monotonic() and user is not None \
+                        and user.password == password:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return user
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, header: str, user: TypeVar('User')) -> None:
+        """ Remember which User an Authorization header resolved to
+        """
+        key = self._key(header)
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            self._entries[key] = (user.id, user.password, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: str) -> None:
+        """ Drop every entry of a User
+        """
+        with self._lock:
+            for key in [key for key, entry in self._entries.items()
+                        if entry[0] == user_id]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        """ Drop every entry
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """ Hit/miss counters and current size
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'size': len(self._entries)}
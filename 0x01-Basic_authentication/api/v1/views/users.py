@@ -2,18 +2,103 @@
 """ Module of Users views
 """
 from api.v1.views import app_views
-from flask import abort, jsonify, request
+from flask import Response, abort, jsonify, make_response, request
+from flask import stream_with_context
+from itertools import islice
 from models.user import User
+from typing import Iterable, Iterator, List, Optional
+import json
+import uuid
+
+# Largest page GET /api/v1/users?limit= will return
+MAX_PAGE_SIZE = 1000
+# Distinguishes ETags of this process from those of earlier runs
+ETAG_PREFIX = uuid.uuid4().hex[:8]
+users_body = (None, None)
+
+
+def project(user: User, fields: Optional[List[str]]) -> dict:
+    """ Public JSON of a User, restricted to fields when given
+    """
+    data = user.to_json()
+    if fields is None:
+        return data
+    return {key: data[key] for key in fields if key in data}
+
+
+def encode_users(users: Iterable[User],
+                 fields: Optional[List[str]]) -> Iterator[str]:
+    """ Yield a JSON array of Users piece by piece
+    """
+    yield "["
+    separator = ""
+    for user in users:
+        if fields is None:
+            encoded = user.to_json_str()
+        else:
+            encoded = json.dumps(project(user, fields), sort_keys=True,
+                                 separators=(',', ':'))
+        yield separator + encoded
+        separator = ","
+    yield "]\n"
+
+
+def all_users_response() -> Response:
+    """ Cached full listing with ETag support
+    """
+    global users_body
+    version = User.version()
+    cached_version, body = users_body
+    if cached_version != version:
+        body = "".join(encode_users(User.all(), None))
+        users_body = (version, body)
+    response = make_response(body)
+    response.mimetype = "application/json"
+    response.set_etag("users-{}-{}".format(ETAG_PREFIX, version))
+    return response.make_conditional(request)
 
 
 @app_views.route('/users', methods=['GET'], strict_slashes=False)
 def view_all_users() -> str:
     """ GET /api/v1/users
+    Query parameters (all optional):
+      - limit: page size, from 1 to MAX_PAGE_SIZE; pages are ordered by id
+      - after: id of the last User of the previous page
+      - fields: comma separated attributes to return, e.g. id,email
+      - stream: 1 to stream every User as a chunked JSON array
     Return:
-      - list of all User objects JSON represented
+      - list of User objects JSON represented
+      - X-Next-Cursor header with the `after` of the next page, if any
+      - 304 if If-None-Match holds the current ETag (no parameters only)
+      - 400 if limit is not a valid page size
     """
-    all_users = [user.to_json() for user in User.all()]
-    return jsonify(all_users)
+    if not request.args:
+        return all_users_response()
+    fields = request.args.get('fields')
+    fields = [key for key in fields.split(',') if key] if fields else None
+    after = request.args.get('after')
+
+    if request.args.get('stream') in ('1', 'true'):
+        users = User.iter_ordered(after)
+        return Response(stream_with_context(encode_users(users, fields)),
+                        mimetype="application/json")
+
+    limit = request.args.get('limit')
+    if limit is None:
+        return jsonify([project(user, fields)
+                        for user in User.iter_ordered(after)])
+    try:
+        limit = int(limit)
+    except ValueError:
+        limit = 0
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        error_msg = "limit must be between 1 and {}".format(MAX_PAGE_SIZE)
+        return jsonify({'error': error_msg}), 400
+    page = list(islice(User.iter_ordered(after), limit + 1))
+    response = jsonify([project(user, fields) for user in page[:limit]])
+    if len(page) > limit:
+        response.headers['X-Next-Cursor'] = page[limit - 1].id
+    return response
 
 
 @app_views.route('/users/<user_id>', methods=['GET'], strict_slashes=False)
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark: generates a large .db_User.json in a temporary
+directory and times User.load_from_file() on the constructor path,
+the fast path and the lazy path.
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+from models import base
+from models.user import User
+
+USERS = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+
+def generate(count: int) -> None:
+    """ Write a snapshot of count users to .db_User.json
+    """
+    objs_json = {}
+    for i in range(count):
+        user_id = str(uuid.uuid4())
+        objs_json[user_id] = {
+            "id": user_id,
+            "created_at": "2024-01-01T00:00:00",
+            "updated_at": "2024-06-01T12:30:45",
+            "email": "user{}@hbtn.io".format(i),
+            "_password": "0" * 64,
+            "first_name": "First{}".format(i),
+            "last_name": "Last{}".format(i),
+        }
+    with open(".db_User.json", "w") as f:
+        json.dump(objs_json, f)
+
+
+def strptime_timestamp(value: str) -> datetime:
+    """ Parse a timestamp the way the constructor did before the fast path
+    """
+    return datetime.strptime(value, base.TIMESTAMP_FORMAT)
+
+
+def constructor_load() -> None:
+    """ Load as before the fast path: cls(**obj) per record, with every
+    timestamp parsed by strptime()
+    """
+    parse_timestamp = base.parse_timestamp
+    base.parse_timestamp = strptime_timestamp
+    try:
+        base.DATA["User"] = {}
+        with open(".db_User.json", "r") as f:
+            for obj_id, obj_json in json.load(f).items():
+                base.DATA["User"][obj_id] = User(**obj_json)
+        User._build_indexes()
+    finally:
+        base.parse_timestamp = parse_timestamp
+
+
+def timed(label: str, load) -> None:
+    """ Print the time taken by one load
+    """
+    start = time.perf_counter()
+    load()
+    elapsed = time.perf_counter() - start
+    print("{:<12} {:>8.3f}s  ({} users)".format(label, elapsed, User.count()))
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        generate(USERS)
+        timed("constructor", constructor_load)
+        timed("fast", User.load_from_file)
+        User.LAZY_LOAD = True
+        timed("lazy", User.load_from_file)
+        start = time.perf_counter()
+        User.search({"email": "user{}@hbtn.io".format(USERS // 2)})
+        print("first lazy get {:.6f}s".format(time.perf_counter() - start))
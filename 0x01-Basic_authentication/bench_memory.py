@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark: bytes per in-memory User with the __slots__ layout
+against the previous __dict__-based layout.
+"""
+import sys
+import tracemalloc
+from datetime import datetime
+
+from models.user import User
+
+USERS = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+CREATED_AT = datetime(2024, 1, 1)
+
+
+class DictUser():
+    """ Same attributes as User, stored in a per-instance __dict__
+    """
+
+    def __init__(self, **kwargs):
+        self.id = kwargs.get('id')
+        self.created_at = CREATED_AT
+        self.updated_at = CREATED_AT
+        self.email = kwargs.get('email')
+        self._password = kwargs.get('_password')
+        self.first_name = kwargs.get('first_name')
+        self.last_name = kwargs.get('last_name')
+
+
+def slotted_user(**kwargs):
+    """ A User built the way load_from_file() builds them
+    """
+    user = User.__new__(User)
+    for key in User._slot_names():
+        object.__setattr__(user, key, kwargs.get(key))
+    user.created_at = CREATED_AT
+    user.updated_at = CREATED_AT
+    return user
+
+
+def measure(label: str, factory) -> None:
+    """ Print the memory held per object built by factory
+    """
+    records = [{"id": "{:036d}".format(i), "email": "user{}@hbtn.io".format(i),
+                "_password": "0" * 64, "first_name": "First",
+                "last_name": "Last"} for i in range(USERS)]
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objs = {record["id"]: factory(**record) for record in records}
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print("{:<8} {:>6.0f} bytes/user".format(
+        label, (after - before) / len(objs)))
+
+
+if __name__ == "__main__":
+    measure("before", DictUser)
+    measure("after", slotted_user)
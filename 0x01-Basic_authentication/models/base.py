@@ -2,39 +2,246 @@
 """ Base module
 """
 from datetime import datetime
-from typing import TypeVar, List, Iterable
+from typing import TypeVar, List, Iterable, Iterator, Optional
 from os import path
+import atexit
+import bisect
 import json
+import logging
+import os
+import threading
+import time
 import uuid
 
 
 TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
 DATA = {}
+JOURNAL_SIZE = {}
+INDEXES = {}
+DIRTY = {}
+FIELDS = {}
+SLOTS = {}
+VERSIONS = {}
+ORDER = {}
+JSON_CACHE = {}
+
+_WRITE_LOCK = threading.RLock()
+_FLUSH_CONDITION = threading.Condition()
+_flusher = None
+_in_flight = 0
+
+
+def parse_timestamp(value: str) -> datetime:
+    """ Parse a TIMESTAMP_FORMAT string
+
+    fromisoformat() is implemented in C and reads exactly this layout;
+    anything else goes through strptime() as before.
+    """
+    if len(value) == 19 and value[10] == 'T':
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            pass
+    return datetime.strptime(value, TIMESTAMP_FORMAT)
+
+
+def flush() -> None:
+    """ Write every class with pending batched changes to disk, after
+    waiting for any batch the background flusher is still writing
+    """
+    global _in_flight
+    with _FLUSH_CONDITION:
+        while _in_flight:
+            _FLUSH_CONDITION.wait()
+        dirty = list(DIRTY.values())
+        DIRTY.clear()
+        _in_flight += 1
+    _write_batch(dirty)
+
+
+def _write_batch(batch: list) -> None:
+    """ Write DIRTY entries popped by the caller, which counted them in
+    _in_flight; a class whose write fails is logged and marked dirty again
+    """
+    global _in_flight
+    try:
+        for cls, _, _, ids in batch:
+            try:
+                cls._flush_changes(ids)
+            except Exception:
+                logging.getLogger(__name__).exception(
+                    "flushing %s failed", cls.__name__)
+                cls._requeue(ids)
+    finally:
+        with _FLUSH_CONDITION:
+            _in_flight -= 1
+            _FLUSH_CONDITION.notify_all()
+
+
+def _due(now: float) -> List[str]:
+    """ Names of the dirty classes whose FLUSH_INTERVAL has elapsed or
+    whose change count reached FLUSH_COUNT; call with _FLUSH_CONDITION held
+    """
+    return [s_class for s_class, (cls, count, since, _) in DIRTY.items()
+            if count >= cls.FLUSH_COUNT or now - since >= cls.FLUSH_INTERVAL]
+
+
+def _flush_loop() -> None:
+    """ Background flusher: writes each dirty class once its
+    FLUSH_INTERVAL has elapsed since it became dirty or FLUSH_COUNT
+    changes have piled up, whichever comes first
+    """
+    global _in_flight
+    while True:
+        with _FLUSH_CONDITION:
+            while True:
+                now = time.monotonic()
+                due = _due(now)
+                if due:
+                    break
+                if not DIRTY:
+                    _FLUSH_CONDITION.wait()
+                else:
+                    deadline = min(since + cls.FLUSH_INTERVAL
+                                   for cls, _, since, _ in DIRTY.values())
+                    _FLUSH_CONDITION.wait(deadline - now)
+            batch = [DIRTY.pop(s_class) for s_class in due]
+            _in_flight += 1
+        _write_batch(batch)
+
+
+atexit.register(flush)
 
 
 class Base():
     """ Base class
+
+    Storage: by default every save()/remove() rewrites the whole
+    `.db_<Class>.json` snapshot. A class with JOURNALED = True instead
+    appends one line per change to `.db_<Class>.journal` and folds the
+    journal into the snapshot every COMPACT_EVERY changes.
+
+    Durability: WRITE_MODE = "sync" persists inside save()/remove().
+    WRITE_MODE = "batched" only records the changed ids; a background
+    thread persists them FLUSH_INTERVAL seconds after the class first
+    became dirty or once FLUSH_COUNT changes are pending, and flush() /
+    interpreter exit write whatever is pending. A batched class that is
+    also JOURNALED appends one journal line per changed id; otherwise the
+    snapshot is rewritten.
+
+    Indexes: attributes listed in INDEXED get a hash index
+    (value -> ids) kept in INDEXES, which search() uses for equality
+    lookups on those attributes.
+
+    Loading: load_from_file() builds instances straight from their JSON
+    without going through __init__. With LAZY_LOAD = True records stay as
+    raw dicts in DATA and are only turned into instances when get() or
+    search() first return them.
+
+    Layout: Base keeps id/created_at/updated_at in __slots__. A subclass
+    that also declares __slots__ has no per-instance __dict__ at all;
+    one that does not keeps its other attributes in __dict__ as usual.
+
+    Serialization cache: to_json_str() keeps each object's encoded public
+    JSON in JSON_CACHE until the object is saved or removed, and version()
+    is a per-class counter bumped by every save(), remove() and load.
+
+    Ordering: ORDER keeps each class's ids sorted so iter_ordered() can
+    page through objects by id without sorting on every call.
     """
 
+    __slots__ = ('id', 'created_at', 'updated_at')
+
+    JOURNALED = False
+    COMPACT_EVERY = 1000
+    WRITE_MODE = "sync"
+    FLUSH_INTERVAL = 1.0
+    FLUSH_COUNT = 100
+    INDEXED = ()
+    LAZY_LOAD = False
+
     def __init__(self, *args: list, **kwargs: dict):
         """ Initialize a Base instance
         """
         s_class = str(self.__class__.__name__)
         if DATA.get(s_class) is None:
             DATA[s_class] = {}
+        if INDEXES.get(s_class) is None:
+            INDEXES[s_class] = {key: {} for key in self.INDEXED}
+        if ORDER.get(s_class) is None:
+            ORDER[s_class] = []
 
         self.id = kwargs.get('id', str(uuid.uuid4()))
         if kwargs.get('created_at') is not None:
-            self.created_at = datetime.strptime(kwargs.get('created_at'),
-                                                TIMESTAMP_FORMAT)
+            self.created_at = parse_timestamp(kwargs.get('created_at'))
         else:
             self.created_at = datetime.utcnow()
         if kwargs.get('updated_at') is not None:
-            self.updated_at = datetime.strptime(kwargs.get('updated_at'),
-                                                TIMESTAMP_FORMAT)
+            self.updated_at = parse_timestamp(kwargs.get('updated_at'))
         else:
             self.updated_at = datetime.utcnow()
 
+    def __setattr__(self, name: str, value) -> None:
+        """ Keep indexes in sync when an indexed attribute of a stored
+        object changes
+        """
+        if name in self.INDEXED and self._is_stored():
+            index = INDEXES[self.__class__.__name__][name]
+            self.__class__._index_discard(index, getattr(self, name, None),
+                                          self.id)
+            index.setdefault(value, {})[self.id] = None
+        super().__setattr__(name, value)
+
+    def _is_stored(self) -> bool:
+        """ True if this very instance is the one held in DATA
+        """
+        table = DATA.get(self.__class__.__name__, {})
+        return table.get(getattr(self, 'id', None)) is self
+
+    @staticmethod
+    def _index_discard(index: dict, value, obj_id: str) -> None:
+        """ Remove one id from an index bucket
+        """
+        bucket = index.get(value)
+        if bucket is not None:
+            bucket.pop(obj_id, None)
+            if not bucket:
+                del index[value]
+
+    @staticmethod
+    def _field(obj, key: str):
+        """ Attribute of an instance, or key of a not yet loaded record
+        """
+        if type(obj) is dict:
+            return obj.get(key)
+        return getattr(obj, key, None)
+
+    @classmethod
+    def _index_add(cls, obj: TypeVar('Base')) -> None:
+        """ Add an object to every index of its class
+        """
+        obj_id = cls._field(obj, 'id')
+        for key, index in INDEXES[cls.__name__].items():
+            index.setdefault(cls._field(obj, key), {})[obj_id] = None
+
+    @classmethod
+    def _index_remove(cls, obj: TypeVar('Base')) -> None:
+        """ Remove an object from every index of its class
+        """
+        obj_id = cls._field(obj, 'id')
+        for key, index in INDEXES[cls.__name__].items():
+            cls._index_discard(index, cls._field(obj, key), obj_id)
+
+    @classmethod
+    def _build_indexes(cls) -> None:
+        """ Rebuild every index of the class, and its id order, from DATA
+        """
+        s_class = cls.__name__
+        INDEXES[s_class] = {key: {} for key in cls.INDEXED}
+        for obj in DATA[s_class].values():
+            cls._index_add(obj)
+        ORDER[s_class] = sorted(DATA[s_class])
+
     def __eq__(self, other: TypeVar('Base')) -> bool:
         """ Equality
         """
@@ -44,11 +251,39 @@ class Base():
             return False
         return (self.id == other.id)
 
+    @classmethod
+    def _slot_names(cls) -> tuple:
+        """ Names of every slot of the class, base classes first
+        """
+        s_class = cls.__name__
+        if s_class not in SLOTS:
+            names = []
+            for klass in reversed(cls.__mro__):
+                slots = klass.__dict__.get('__slots__', ())
+                if isinstance(slots, str):
+                    slots = (slots,)
+                names.extend(name for name in slots
+                             if name not in ('__dict__', '__weakref__'))
+            SLOTS[s_class] = tuple(names)
+        return SLOTS[s_class]
+
+    def _items(self) -> Iterable[tuple]:
+        """ (name, value) of every attribute set, slots then __dict__
+        """
+        for name in self._slot_names():
+            try:
+                yield name, object.__getattribute__(self, name)
+            except AttributeError:
+                continue
+        instance_dict = getattr(self, '__dict__', None)
+        if instance_dict:
+            yield from instance_dict.items()
+
     def to_json(self, for_serialization: bool = False) -> dict:
         """ Convert the object a JSON dictionary
         """
         result = {}
-        for key, value in self.__dict__.items():
+        for key, value in self._items():
             if not for_serialization and key[0] == '_':
                 continue
             if type(value) is datetime:
@@ -57,49 +292,268 @@ class Base():
                 result[key] = value
         return result
 
+    @classmethod
+    def _file_path(cls) -> str:
+        """ Path of the snapshot file
+        """
+        return ".db_{}.json".format(cls.__name__)
+
+    @classmethod
+    def _journal_path(cls) -> str:
+        """ Path of the append-only journal file
+        """
+        return ".db_{}.journal".format(cls.__name__)
+
+    @classmethod
+    def _from_json(cls, obj_json: dict) -> TypeVar('Base'):
+        """ Build an instance from its serialized form without __init__
+        """
+        s_class = cls.__name__
+        if s_class not in FIELDS:
+            FIELDS[s_class] = tuple(cls().to_json(True).keys())
+        values = {key: obj_json.get(key) for key in FIELDS[s_class]}
+        for key in ('created_at', 'updated_at'):
+            value = values.get(key)
+            values[key] = parse_timestamp(value) if value is not None \
+                else datetime.utcnow()
+        obj = cls.__new__(cls)
+        slots = cls._slot_names()
+        for key in slots:
+            object.__setattr__(obj, key, values.pop(key, None))
+        if values:
+            obj.__dict__.update(values)
+        return obj
+
+    @classmethod
+    def _load_record(cls, obj_json: dict):
+        """ What DATA holds for a loaded record
+        """
+        return obj_json if cls.LAZY_LOAD else cls._from_json(obj_json)
+
+    @classmethod
+    def _materialize(cls, obj_id: str) -> TypeVar('Base'):
+        """ Return the instance for an id, building it if still raw
+        """
+        table = DATA[cls.__name__]
+        obj = table.get(obj_id)
+        if type(obj) is dict:
+            obj = cls._from_json(obj)
+            table[obj_id] = obj
+        return obj
+
     @classmethod
     def load_from_file(cls):
-        """ Load all objects from file
+        """ Load all objects from file: the snapshot, then journal replay
         """
         s_class = cls.__name__
-        file_path = ".db_{}.json".format(s_class)
         DATA[s_class] = {}
-        if not path.exists(file_path):
-            return
+        JOURNAL_SIZE[s_class] = 0
+        JSON_CACHE[s_class] = {}
+        VERSIONS[s_class] = VERSIONS.get(s_class, 0) + 1
 
-        with open(file_path, 'r') as f:
-            objs_json = json.load(f)
-            for obj_id, obj_json in objs_json.items():
-                DATA[s_class][obj_id] = cls(**obj_json)
+        file_path = cls._file_path()
+        if path.exists(file_path):
+            with open(file_path, 'r') as f:
+                objs_json = json.load(f)
+                for obj_id, obj_json in objs_json.items():
+                    DATA[s_class][obj_id] = cls._load_record(obj_json)
+
+        journal_path = cls._journal_path()
+        if not path.exists(journal_path):
+            cls._build_indexes()
+            return
+        good = 0
+        with open(journal_path, 'rb') as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("unterminated journal line")
+                    entry = json.loads(line)
+                except ValueError:
+                    # A torn last line from an interrupted append
+                    break
+                if entry['op'] == 'save':
+                    DATA[s_class][entry['id']] = cls._load_record(entry['obj'])
+                else:
+                    DATA[s_class].pop(entry['id'], None)
+                JOURNAL_SIZE[s_class] += 1
+                good += len(line)
+        if good < path.getsize(journal_path):
+            # Drop the torn tail so later appends start on a fresh line
+            with _WRITE_LOCK:
+                with open(journal_path, 'r+b') as f:
+                    f.truncate(good)
+        cls._build_indexes()
 
     @classmethod
     def save_to_file(cls):
         """ Save all objects to file
+
+        The snapshot is written to a temporary file and renamed over the
+        old one, then the journal it now contains is truncated.
+        """
+        s_class = cls.__name__
+        file_path = cls._file_path()
+        with _WRITE_LOCK:
+            objs_json = {}
+            for obj_id, obj in list(DATA[s_class].items()):
+                if type(obj) is dict:
+                    objs_json[obj_id] = obj
+                else:
+                    objs_json[obj_id] = obj.to_json(True)
+
+            tmp_path = "{}.tmp".format(file_path)
+            with open(tmp_path, 'w') as f:
+                json.dump(objs_json, f)
+            os.replace(tmp_path, file_path)
+
+            if path.exists(cls._journal_path()):
+                open(cls._journal_path(), 'w').close()
+            JOURNAL_SIZE[s_class] = 0
+
+    @classmethod
+    def _append_journal(cls, *entries: dict):
+        """ Append changes to the journal, compacting when it is long
+        """
+        s_class = cls.__name__
+        with _WRITE_LOCK:
+            with open(cls._journal_path(), 'a') as f:
+                f.write("".join(json.dumps(entry) + "\n"
+                                for entry in entries))
+            JOURNAL_SIZE[s_class] = JOURNAL_SIZE.get(s_class, 0) + \
+                len(entries)
+            if JOURNAL_SIZE[s_class] >= cls.COMPACT_EVERY:
+                cls.save_to_file()
+
+    @classmethod
+    def _flush_changes(cls, ids: set):
+        """ Persist the current state of the given ids: one journal line
+        each for a JOURNALED class, a snapshot rewrite otherwise
+        """
+        if not cls.JOURNALED:
+            cls.save_to_file()
+            return
+        # Serialize under the write lock so a concurrent flush can never
+        # append an older state of an object after a newer one
+        with _WRITE_LOCK:
+            table = DATA.get(cls.__name__, {})
+            entries = []
+            for obj_id in ids:
+                obj = table.get(obj_id)
+                if obj is None:
+                    entries.append({'op': 'remove', 'id': obj_id})
+                elif type(obj) is dict:
+                    entries.append({'op': 'save', 'id': obj_id, 'obj': obj})
+                else:
+                    entries.append({'op': 'save', 'id': obj_id,
+                                    'obj': obj.to_json(True)})
+            if entries:
+                cls._append_journal(*entries)
+
+    @classmethod
+    def _requeue(cls, ids: set):
+        """ Mark ids whose flush failed as dirty again; they are retried
+        FLUSH_INTERVAL seconds later rather than at once
+        """
+        s_class = cls.__name__
+        with _FLUSH_CONDITION:
+            entry = DIRTY.get(s_class)
+            if entry is None:
+                DIRTY[s_class] = (cls, 0, time.monotonic(), set(ids))
+            else:
+                entry[3].update(ids)
+            _FLUSH_CONDITION.notify_all()
+
+    @classmethod
+    def _mark_dirty(cls, obj_id: str):
+        """ Queue a changed id for the background flusher, waking it only
+        when the class becomes dirty or reaches FLUSH_COUNT changes
         """
+        global _flusher
         s_class = cls.__name__
-        file_path = ".db_{}.json".format(s_class)
-        objs_json = {}
-        for obj_id, obj in DATA[s_class].items():
-            objs_json[obj_id] = obj.to_json(True)
+        with _FLUSH_CONDITION:
+            entry = DIRTY.get(s_class)
+            if entry is None:
+                entry = (cls, 0, time.monotonic(), set())
+            _, count, since, ids = entry
+            ids.add(obj_id)
+            DIRTY[s_class] = (cls, count + 1, since, ids)
+            if _flusher is None:
+                _flusher = threading.Thread(target=_flush_loop,
+                                            name="base-flusher",
+                                            daemon=True)
+                _flusher.start()
+            if count == 0 or count + 1 == cls.FLUSH_COUNT:
+                _FLUSH_CONDITION.notify()
 
-        with open(file_path, 'w') as f:
-            json.dump(objs_json, f)
+    @classmethod
+    def _write_change(cls, op: str, obj: TypeVar('Base')):
+        """ Persist one save/remove according to WRITE_MODE and JOURNALED
+        """
+        if cls.WRITE_MODE == "batched":
+            cls._mark_dirty(obj.id)
+        elif cls.JOURNALED:
+            entry = {'op': op, 'id': obj.id}
+            if op == 'save':
+                entry['obj'] = obj.to_json(True)
+            cls._append_journal(entry)
+        else:
+            cls.save_to_file()
 
     def save(self):
         """ Save current object
         """
         s_class = self.__class__.__name__
         self.updated_at = datetime.utcnow()
-        DATA[s_class][self.id] = self
-        self.__class__.save_to_file()
+        existing = DATA[s_class].get(self.id)
+        if existing is not self:
+            if existing is not None:
+                self.__class__._index_remove(existing)
+            else:
+                bisect.insort(ORDER[s_class], self.id)
+            DATA[s_class][self.id] = self
+            self.__class__._index_add(self)
+        self.__class__._changed(self.id)
+        self.__class__._write_change('save', self)
 
     def remove(self):
         """ Remove object
         """
         s_class = self.__class__.__name__
         if DATA[s_class].get(self.id) is not None:
+            self.__class__._index_remove(DATA[s_class][self.id])
             del DATA[s_class][self.id]
-            self.__class__.save_to_file()
+            ids = ORDER[s_class]
+            position = bisect.bisect_left(ids, self.id)
+            if position < len(ids) and ids[position] == self.id:
+                del ids[position]
+            self.__class__._changed(self.id)
+            self.__class__._write_change('remove', self)
+
+    @classmethod
+    def _changed(cls, obj_id: str):
+        """ Drop the cached JSON of an object and bump the class version
+        """
+        s_class = cls.__name__
+        JSON_CACHE.get(s_class, {}).pop(obj_id, None)
+        VERSIONS[s_class] = VERSIONS.get(s_class, 0) + 1
+
+    @classmethod
+    def version(cls) -> int:
+        """ Counter that changes whenever the collection changes
+        """
+        return VERSIONS.get(cls.__name__, 0)
+
+    def to_json_str(self) -> str:
+        """ Public JSON of the object, encoded once per save
+        """
+        cache = JSON_CACHE.setdefault(self.__class__.__name__, {})
+        encoded = cache.get(self.id)
+        if encoded is None:
+            encoded = json.dumps(self.to_json(), sort_keys=True,
+                                 separators=(',', ':'))
+            cache[self.id] = encoded
+        return encoded
 
     @classmethod
     def count(cls) -> int:
@@ -114,12 +568,48 @@ class Base():
         """
         return cls.search()
 
+    @classmethod
+    def iter_ordered(cls, after: Optional[str] = None
+                     ) -> Iterator[TypeVar('Base')]:
+        """ Yield objects in ascending id order, starting after `after`
+
+        Each step re-locates the last id returned, so objects saved or
+        removed during iteration never make it skip or repeat one.
+        """
+        ids = ORDER[cls.__name__]
+        position = 0 if after is None else bisect.bisect_right(ids, after)
+        while position < len(ids):
+            obj_id = ids[position]
+            obj = cls._materialize(obj_id)
+            if obj is not None:
+                yield obj
+            position = bisect.bisect_right(ids, obj_id)
+
     @classmethod
     def get(cls, id: str) -> TypeVar('Base'):
         """ Return one object by ID
         """
+        return cls._materialize(id)
+
+    @classmethod
+    def _index_for(cls, attributes: dict) -> Optional[str]:
+        """ Name of an indexed attribute usable for this query, if any
+        """
+        for key, value in attributes.items():
+            if key in cls.INDEXED and value.__hash__ is not None:
+                return key
+        return None
+
+    @classmethod
+    def explain(cls, attributes: dict = {}) -> dict:
+        """ Describe how search() would run a query
+        """
         s_class = cls.__name__
-        return DATA[s_class].get(id)
+        key = cls._index_for(attributes)
+        if key is None:
+            return {'path': 'scan', 'candidates': len(DATA[s_class])}
+        bucket = INDEXES[s_class][key].get(attributes[key], {})
+        return {'path': 'index', 'index': key, 'candidates': len(bucket)}
 
     @classmethod
     def search(cls, attributes: dict = {}) -> List[TypeVar('Base')]:
@@ -133,5 +623,14 @@ class Base():
                 if (getattr(obj, k) != v):
                     return False
             return True
-        
-        return list(filter(_search, DATA[s_class].values()))
+
+        key = cls._index_for(attributes)
+        if key is not None:
+            ids = INDEXES[s_class][key].get(attributes[key], {})
+            candidates = [cls._materialize(obj_id) for obj_id in ids]
+        elif cls.LAZY_LOAD:
+            candidates = [cls._materialize(obj_id)
+                          for obj_id in list(DATA[s_class])]
+        else:
+            candidates = DATA[s_class].values()
+        return list(filter(_search, candidates))
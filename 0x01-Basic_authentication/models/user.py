@@ -9,6 +9,12 @@ class User(Base):
     """ User class
     """
 
+    __slots__ = ('email', '_password', 'first_name', 'last_name')
+
+    JOURNALED = True
+    WRITE_MODE = "batched"
+    INDEXED = ('email',)
+
     def __init__(self, *args: list, **kwargs: dict):
         """ Initialize a User instance
         """
@@ -3,7 +3,8 @@
 Route module for the API
 """
 
-from api.v1.views import users.py
+from api.v1.views import app_views
+from api.v1.auth.path_matcher import PathMatcher
 from flask import Flask, jsonify, abort, request
 from flask_cors import CORS
 from os import getenv
@@ -11,7 +12,7 @@ from os import getenv
 # Initialize Flask application
 api_app = Flask(__name__)
 api_app.config['JSONIFY_PRETTYPRINT_REGULAR'] = True
-api_app.register_blueprint(users.py)
+api_app.register_blueprint(app_views)
 CORS(api_app, resources={r"/api/v1/*": {"origins": "*"}})
 
 authentication = None
@@ -31,8 +32,39 @@ elif auth_type == "session_exp_auth":
     from api.v1.auth.session_exp_auth import SessionExpAuth
     authentication = SessionExpAuth()
 elif auth_type == "session_db_auth":
-    from api.v1.auth.session_db_auth import SessionDBAuth
-    authentication = SessionDBAuth()
+    from api.v1.auth.session_db_cache import CachedSessionDBAuth
+    authentication = CachedSessionDBAuth()
+
+if auth_type == "session_auth":
+    from api.v1.auth.session_store import get_session_store
+    authentication.user_id_by_session_id = get_session_store()
+elif auth_type == "session_exp_auth":
+    from api.v1.auth.session_expiry import ExpiringSessionStore
+    from api.v1.auth.session_store import get_session_store
+    sliding = getenv("SESSION_SLIDING", "") in ("1", "true")
+    if sliding and getenv("SESSION_STORE") == "sqlite":
+        raise ValueError("SESSION_SLIDING needs the in-process session "
+                         "store, not SESSION_STORE=sqlite")
+    authentication.user_id_by_session_id = ExpiringSessionStore(
+        authentication.session_duration,
+        sliding=sliding,
+        store=get_session_store()
+    )
+
+# Public endpoints per blueprint, compiled once at startup
+app_views_public = [
+    '/api/v1/status/',
+    '/api/v1/unauthorized/',
+    '/api/v1/forbidden/',
+    '/api/v1/auth_session/login/'
+]
+public_endpoints = {
+    app_views.name: PathMatcher(app_views_public),
+}
+no_public_endpoints = PathMatcher()
+# Requests that fail routing (404, 405) have no blueprint, so they are
+# matched on their path alone
+unrouted_public_endpoints = PathMatcher(app_views_public)
 
 
 @api_app.errorhandler(404)
@@ -59,14 +91,11 @@ def validate_request() -> str:
     if authentication is None:
         return
 
-    public_endpoints = [
-        '/api/v1/status/',
-        '/api/v1/unauthorized/',
-        '/api/v1/forbidden/',
-        '/api/v1/auth_session/login/'
-    ]
-
-    if not authentication.require_auth(request.path, public_endpoints):
+    if request.blueprint is None:
+        matcher = unrouted_public_endpoints
+    else:
+        matcher = public_endpoints.get(request.blueprint, no_public_endpoints)
+    if matcher.match(request.path):
         return
 
     if authentication.authorization_header(request) is None \
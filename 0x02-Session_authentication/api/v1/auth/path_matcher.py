@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+""" Module of the excluded-path matcher
+"""
+from typing import Iterable
+
+# Trie node markers; they cannot collide with the 1-char keys of a path
+_EXACT = 0
+_PREFIX = 1
+
+
+class PathMatcher():
+    """ Trie of paths that do not require authentication
+
+    Paths are compared slash-tolerant like Auth.require_auth: "/a/b" and
+    "/a/b/" are the same path. A pattern ending with "*" matches every
+    path starting with what precedes the "*" ("/api/v1/stat*" matches
+    "/api/v1/stats" and "/api/v1/status/"). A lookup walks the path once,
+    whatever the number of patterns.
+    """
+
+    def __init__(self, patterns: Iterable[str] = ()):
+        """ Compile the patterns
+        """
+        self._root = {}
+        for pattern in patterns:
+            self.add(pattern)
+
+    @staticmethod
+    def _normalize(path: str) -> str:
+        """ Path with exactly one trailing slash
+        """
+        return path if path.endswith('/') else path + '/'
+
+    def add(self, pattern: str) -> None:
+        """ Add one exact path or "*"-terminated prefix
+        """
+        if pattern.endswith('*'):
+            pattern, marker = pattern[:-1], _PREFIX
+        else:
+            pattern, marker = self._normalize(pattern), _EXACT
+        node = self._root
+        for char in pattern:
+            node = node.setdefault(char, {})
+        node[marker] = True
+
+    def match(self, path: str) -> bool:
+        """ True if path is one of the patterns
+        """
+        if path is None:
+            return False
+        node = self._root
+        for char in self._normalize(path):
+            if _PREFIX in node:
+                return True
+            node = node.get(char)
+            if node is None:
+                return False
+        return _PREFIX in node or _EXACT in node
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Module of the read-through session cache in front of SessionDBAuth
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from os import getenv
+from typing import Any, Optional
+
+from api.v1.auth.session_db_auth import SessionDBAuth
+from models.user_session import UserSession
+
+
+class SessionCache:
+    """Bounded LRU cache whose entries expire after a TTL"""
+
+    MISSING = object()
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 300.0) -> None:
+        """Creates an empty cache"""
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        """Returns the cached value of key, or SessionCache.MISSING"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return self.MISSING
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return self.MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Caches value under key for ttl seconds (default: self.ttl)"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: str) -> None:
+        """Drops key from the cache"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        """Returns the number of cached entries"""
+        return len(self._entries)
+
+
+class CachedSessionDBAuth(SessionDBAuth):
+    """SessionDBAuth with a read-through cache of session lookups.
+
+    A session ID resolves to (user_id, created_at) from the in-memory
+    UserSession table once, then from this cache until its entry expires,
+    the session is destroyed or it is pushed out of the cache. Unknown
+    session IDs are cached too, for a short time, so floods of bogus
+    cookies do not reach the UserSession table either.
+    """
+
+    def __init__(self) -> None:
+        """Sizes the cache from SESSION_CACHE_SIZE and SESSION_DURATION"""
+        super().__init__()
+        ttl = self.session_duration if self.session_duration > 0 else 300
+        self.session_cache = SessionCache(
+            maxsize=int(getenv("SESSION_CACHE_SIZE", "10000")), ttl=ttl)
+        self.negative_ttl = float(getenv("SESSION_CACHE_NEGATIVE_TTL", "5"))
+
+    @staticmethod
+    def _load_session(session_id: str) -> Optional[tuple]:
+        """Reads (user_id, created_at) of a session from the in-memory
+        UserSession table.
+
+        The table is not reloaded from file here: load_from_file() empties
+        it before refilling it, so lookups racing a reload would see false
+        misses and cache them as negative entries.
+        """
+        sessions = UserSession.search({"session_id": session_id})
+        if not sessions:
+            return None
+        return sessions[0].user_id, sessions[0].created_at
+
+    def create_session(self, user_id: str = None) -> str:
+        """Creates a session and forgets any cached miss for its ID"""
+        session_id = super().create_session(user_id)
+        if session_id is not None:
+            self.session_cache.invalidate(session_id)
+        return session_id
+
+    def user_id_for_session_id(self, session_id: str = None) -> str:
+        """Returns the user ID of a live session, using the cache"""
+        if session_id is None or not isinstance(session_id, str):
+            return None
+        entry = self.session_cache.get(session_id)
+        if entry is SessionCache.MISSING:
+            entry = self._load_session(session_id)
+            ttl = None if entry is not None else self.negative_ttl
+            self.session_cache.put(session_id, entry, ttl)
+        if entry is None:
+            return None
+
+        user_id, created_at = entry
+        if self.session_duration > 0:
+            expires_at = created_at + timedelta(seconds=self.session_duration)
+            if expires_at < datetime.utcnow():
+                self.session_cache.invalidate(session_id)
+                return None
+        return user_id
+
+    def destroy_session(self, request=None) -> bool:
+        """Destroys the request's session and drops it from the cache"""
+        session_id = self.session_cookie(request)
+        destroyed = super().destroy_session(request)
+        if session_id is not None:
+            self.session_cache.invalidate(session_id)
+        return destroyed
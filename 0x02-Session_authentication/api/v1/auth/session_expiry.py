@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Module of the timer-wheel session store used by SessionExpAuth
+"""
+import math
+import threading
+import time
+from collections.abc import MutableMapping
+from datetime import datetime
+from typing import Any, Callable, Iterator
+
+
+class ExpiringSessionStore(MutableMapping):
+    """Session store that evicts sessions `duration` seconds after they
+    were created, or last used when `sliding` is on.
+
+    Sessions are hashed into a timing wheel: one bucket per `resolution`
+    seconds, keyed by the tick at which they expire. Every access first
+    advances the wheel to the current tick and drops the buckets it
+    passes, so each session is evicted exactly once, in O(1), and memory
+    follows the number of live sessions. A duration of 0 or less never
+    expires sessions, like SessionExpAuth.
+
+    Values live in `store` (a plain dict by default), so the wheel can sit
+    on top of a shared store such as SQLiteSessionStore. The wheel itself
+    is per process: each process evicts the sessions it created, and
+    SessionExpAuth's own age check covers the rest. Sliding expiry needs
+    every access to be seen by the wheel, so it requires a store that is
+    not shared between processes.
+    """
+
+    def __init__(self, duration: int, resolution: float = 1.0,
+                 sliding: bool = False,
+                 clock: Callable[[], float] = time.monotonic,
+                 store: MutableMapping = None) -> None:
+        """Creates a store with an empty wheel"""
+        self.duration = duration
+        self.resolution = resolution
+        self.sliding = sliding
+        self._clock = clock
+        self._store = {} if store is None else store
+        self._ticks = {}
+        self._wheel = {}
+        self._last_tick = self._now_tick()
+        self._lock = threading.RLock()
+
+    def _now_tick(self) -> int:
+        """Returns the tick the clock is currently in"""
+        return int(self._clock() // self.resolution)
+
+    def _expiry_tick(self) -> Any:
+        """Returns the tick at which a session touched now expires"""
+        if self.duration <= 0:
+            return None
+        return math.ceil((self._clock() + self.duration) / self.resolution)
+
+    def _advance(self) -> None:
+        """Evicts every session whose tick has passed"""
+        now_tick = self._now_tick()
+        if now_tick <= self._last_tick:
+            return
+        if now_tick - self._last_tick > len(self._wheel):
+            # Long idle gap: visit the few buckets instead of every tick
+            due = [tick for tick in self._wheel if tick <= now_tick]
+        else:
+            due = range(self._last_tick + 1, now_tick + 1)
+        for tick in due:
+            for session_id in self._wheel.pop(tick, ()):
+                del self._ticks[session_id]
+                try:
+                    del self._store[session_id]
+                except KeyError:
+                    pass
+        self._last_tick = now_tick
+
+    def _schedule(self, session_id: Any, tick: Any) -> None:
+        """Puts a session in the bucket of its expiry tick"""
+        if tick is not None:
+            self._ticks[session_id] = tick
+            self._wheel.setdefault(tick, set()).add(session_id)
+
+    def _unschedule(self, session_id: Any) -> None:
+        """Takes a session out of its bucket, if it has one"""
+        tick = self._ticks.pop(session_id, None)
+        bucket = self._wheel.get(tick)
+        if bucket is not None:
+            bucket.discard(session_id)
+            if not bucket:
+                del self._wheel[tick]
+
+    def __getitem__(self, session_id: Any) -> Any:
+        """Returns a live session's value, sliding its expiry if enabled.
+
+        With sliding on, a dict value's `created_at` is refreshed too so
+        SessionExpAuth's own age check agrees with the store.
+        """
+        with self._lock:
+            self._advance()
+            value = self._store[session_id]
+            if self.sliding and session_id in self._ticks:
+                new_tick = self._expiry_tick()
+                if new_tick != self._ticks[session_id]:
+                    self._unschedule(session_id)
+                    self._schedule(session_id, new_tick)
+                if isinstance(value, dict) and "created_at" in value:
+                    value["created_at"] = datetime.now()
+            return value
+
+    def get(self, session_id: Any, default: Any = None) -> Any:
+        """Returns a live session's value, or default"""
+        try:
+            return self[session_id]
+        except (KeyError, TypeError):
+            return default
+
+    def __setitem__(self, session_id: Any, value: Any) -> None:
+        """Stores a session, starting its lifetime now"""
+        with self._lock:
+            self._advance()
+            self._unschedule(session_id)
+            self._store[session_id] = value
+            self._schedule(session_id, self._expiry_tick())
+
+    def __delitem__(self, session_id: Any) -> None:
+        """Removes a session"""
+        with self._lock:
+            self._advance()
+            self._unschedule(session_id)
+            del self._store[session_id]
+
+    def __iter__(self) -> Iterator:
+        """Iterates over a snapshot of the live session IDs"""
+        with self._lock:
+            self._advance()
+            return iter(list(self._store))
+
+    def __len__(self) -> int:
+        """Returns the number of live sessions"""
+        with self._lock:
+            self._advance()
+            return len(self._store)
+
+    def __repr__(self) -> str:
+        """Shows the live sessions like a dict"""
+        with self._lock:
+            self._advance()
+            return repr(dict(self._store.items()))
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Module of the session stores backing SessionAuth.user_id_by_session_id
+"""
+import json
+import sqlite3
+import threading
+from collections.abc import MutableMapping
+from datetime import datetime
+from os import getenv
+from typing import Any, Iterator
+
+
+class ShardedSessionStore(MutableMapping):
+    """In-process session store split into lock-striped shards.
+
+    Every session ID hashes to one shard, a plain dict with its own lock,
+    so threads working on different sessions rarely wait on each other.
+    Behaves like the dict it replaces.
+    """
+
+    def __init__(self, shards: int = 16) -> None:
+        """Creates `shards` empty shards"""
+        self._shards = [({}, threading.Lock()) for _ in range(max(1, shards))]
+
+    def _shard(self, session_id: Any) -> tuple:
+        """Returns the (dict, lock) pair owning a session ID"""
+        return self._shards[hash(session_id) % len(self._shards)]
+
+    def __getitem__(self, session_id: Any) -> Any:
+        """Returns the value stored for a session ID"""
+        data, _ = self._shard(session_id)
+        return data[session_id]
+
+    def get(self, session_id: Any, default: Any = None) -> Any:
+        """Returns the value stored for a session ID, or default"""
+        data, _ = self._shard(session_id)
+        return data.get(session_id, default)
+
+    def __setitem__(self, session_id: Any, value: Any) -> None:
+        """Stores the value of a session ID"""
+        data, lock = self._shard(session_id)
+        with lock:
+            data[session_id] = value
+
+    def __delitem__(self, session_id: Any) -> None:
+        """Removes a session ID"""
+        data, lock = self._shard(session_id)
+        with lock:
+            del data[session_id]
+
+    def __iter__(self) -> Iterator:
+        """Iterates over a snapshot of the session IDs"""
+        for data, lock in self._shards:
+            with lock:
+                keys = list(data)
+            yield from keys
+
+    def __len__(self) -> int:
+        """Returns the number of sessions"""
+        return sum(len(data) for data, _ in self._shards)
+
+    def __repr__(self) -> str:
+        """Shows the sessions like the dict this store replaces"""
+        return repr(dict(self.items()))
+
+
+def _encode(value: Any) -> str:
+    """Serializes a session value, keeping datetimes"""
+    def default(obj):
+        if isinstance(obj, datetime):
+            return {"__datetime__": obj.isoformat()}
+        raise TypeError(f"{type(obj).__name__} is not serializable")
+    return json.dumps(value, default=default)
+
+
+def _decode(text: str) -> Any:
+    """Deserializes a session value written by _encode"""
+    def object_hook(obj):
+        if len(obj) == 1 and "__datetime__" in obj:
+            return datetime.fromisoformat(obj["__datetime__"])
+        return obj
+    return json.loads(text, object_hook=object_hook)
+
+
+class SQLiteSessionStore(MutableMapping):
+    """Session store kept in an SQLite file.
+
+    Every process pointing at the same file (e.g. gunicorn workers) sees
+    the same sessions. Lookups and writes go through the primary key, and
+    each thread uses its own connection.
+    """
+
+    def __init__(self, path: str = ".sessions.db") -> None:
+        """Opens (and if needed creates) the sessions table in `path`"""
+        self.path = path
+        self._local = threading.local()
+        connection = self._connection()
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+        connection.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Returns this thread's connection, opening it on first use"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def __getitem__(self, session_id: Any) -> Any:
+        """Returns the value stored for a session ID"""
+        if not isinstance(session_id, str):
+            raise KeyError(session_id)
+        row = self._connection().execute(
+            "SELECT value FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(session_id)
+        return _decode(row[0])
+
+    def __setitem__(self, session_id: str, value: Any) -> None:
+        """Stores the value of a session ID"""
+        connection = self._connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO sessions (session_id, value)"
+            " VALUES (?, ?)",
+            (session_id, _encode(value))
+        )
+        connection.commit()
+
+    def __delitem__(self, session_id: Any) -> None:
+        """Removes a session ID"""
+        if not isinstance(session_id, str):
+            raise KeyError(session_id)
+        connection = self._connection()
+        cursor = connection.execute(
+            "DELETE FROM sessions WHERE session_id = ?", (session_id,)
+        )
+        connection.commit()
+        if cursor.rowcount == 0:
+            raise KeyError(session_id)
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterates over the session IDs"""
+        rows = self._connection().execute(
+            "SELECT session_id FROM sessions").fetchall()
+        return (row[0] for row in rows)
+
+    def __len__(self) -> int:
+        """Returns the number of sessions"""
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def __repr__(self) -> str:
+        """Shows the sessions like the dict this store replaces"""
+        return repr(dict(self.items()))
+
+
+def get_session_store() -> MutableMapping:
+    """Builds the session store selected by the environment.
+
+    SESSION_STORE=sqlite uses SQLiteSessionStore on SESSION_STORE_PATH,
+    anything else a ShardedSessionStore with SESSION_STORE_SHARDS shards.
+    """
+    if getenv("SESSION_STORE") == "sqlite":
+        return SQLiteSessionStore(getenv("SESSION_STORE_PATH", ".sessions.db"))
+    return ShardedSessionStore(int(getenv("SESSION_STORE_SHARDS", "16")))
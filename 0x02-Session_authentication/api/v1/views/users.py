@@ -3,19 +3,78 @@
 Module for User views
 """
 
+import json
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional
+
 from api.v1.views import app_views
-from flask import abort, jsonify, request
+from flask import Response, abort, jsonify, request, stream_with_context
 from models.user import User
 
+# Largest page GET /api/v1/users?limit= will return
+MAX_PAGE_SIZE = 1000
+
+
+def select_fields(usr: User, fields: Optional[List[str]]) -> dict:
+    """Returns the public JSON of a User, keeping only `fields` if given"""
+    usr_json = usr.to_json()
+    if fields is None:
+        return usr_json
+    return {key: usr_json[key] for key in fields if key in usr_json}
+
+
+def stream_users(users: Iterable[User],
+                 fields: Optional[List[str]]) -> Iterator[str]:
+    """Yields a JSON array of Users one element at a time"""
+    yield "["
+    for index, usr in enumerate(users):
+        prefix = "," if index else ""
+        yield prefix + json.dumps(select_fields(usr, fields))
+    yield "]\n"
+
 
 @app_views.route('/users', methods=['GET'], strict_slashes=False)
 def get_all_users() -> str:
     """GET /api/v1/users
+    Query parameters (optional):
+      - limit: page size between 1 and MAX_PAGE_SIZE, ordered by User ID
+      - after: ID of the last User of the previous page
+      - fields: comma separated attributes to keep, e.g. id,email
+      - stream: 1 to stream all Users as a chunked JSON array
     Returns:
-      - List of all User objects in JSON format
+      - List of User objects in JSON format
+      - X-Next-Cursor header with the `after` value of the next page
+      - 400 if limit is not a valid page size
     """
-    users_list = [usr.to_json() for usr in User.all()]
-    return jsonify(users_list)
+    fields = request.args.get("fields")
+    fields = [key for key in fields.split(",") if key] if fields else None
+    after = request.args.get("after")
+    limit = request.args.get("limit")
+
+    if request.args.get("stream") in ("1", "true"):
+        return Response(
+            stream_with_context(
+                stream_users(User.iter_ordered(after), fields)),
+            mimetype="application/json"
+        )
+
+    if limit is None:
+        users = User.iter_ordered(after) if after or fields else User.all()
+        return jsonify([select_fields(usr, fields) for usr in users])
+
+    try:
+        limit = int(limit)
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        return jsonify(
+            {'error': f"limit must be between 1 and {MAX_PAGE_SIZE}"}), 400
+
+    page = list(islice(User.iter_ordered(after), limit + 1))
+    response = jsonify([select_fields(usr, fields) for usr in page[:limit]])
+    if len(page) > limit:
+        response.headers["X-Next-Cursor"] = page[limit - 1].id
+    return response
 
 
 @app_views.route('/users/<user_id>', methods=['GET'], strict_slashes=False)
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Benchmark of session lookups/sec under thread contention for the
+plain dict, ShardedSessionStore and SQLiteSessionStore.
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+from api.v1.auth.session_store import ShardedSessionStore, SQLiteSessionStore
+
+SESSIONS = 10000
+THREADS = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+LOOKUPS = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+
+
+def bench(label, store):
+    """Fills the store, then times THREADS threads doing lookups"""
+    session_ids = [str(uuid.uuid4()) for _ in range(SESSIONS)]
+    for session_id in session_ids:
+        store[session_id] = "user-" + session_id[:8]
+
+    def worker(offset):
+        for i in range(LOOKUPS):
+            store.get(session_ids[(offset + i) % SESSIONS])
+            if i % 100 == 0:
+                store[str(uuid.uuid4())] = "new-user"
+
+    threads = [threading.Thread(target=worker, args=(n * 997,))
+               for n in range(THREADS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<8} {THREADS * LOOKUPS / elapsed:>12,.0f} lookups/sec")
+
+
+if __name__ == "__main__":
+    bench("dict", {})
+    bench("sharded", ShardedSessionStore())
+    with tempfile.TemporaryDirectory() as tmp:
+        bench("sqlite", SQLiteSessionStore(os.path.join(tmp, "sessions.db")))
@@ -4,10 +4,40 @@ Basic Flask app for user authentication.
 """
 from flask import Flask, request, abort, jsonify, redirect
 from auth import Auth
+from hashing import PoolSaturated
 
 app = Flask(__name__)
 AUTH = Auth()
 
+
+@app.teardown_appcontext
+def close_db_session(exception: BaseException = None) -> None:
+    """
+    Release the request thread's database session.
+
+    Args:
+        exception (BaseException, optional): Error that ended the request.
+    """
+    AUTH.close_session()
+
+
+@app.errorhandler(PoolSaturated)
+def hashing_saturated(error: PoolSaturated) -> str:
+    """
+    Turn a full hashing pool into a fast 503.
+
+    Args:
+        error (PoolSaturated): The rejection, with its retry estimate.
+
+    Returns:
+        JSON response with status 503 and a Retry-After header.
+    """
+    response = jsonify({'message': 'server busy, retry later'})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+
 @app.route('/', methods=['GET'], strict_slashes=False)
 def index() -> str:
     """
@@ -71,7 +101,7 @@ def login() -> str:
 @app.route('/sessions', methods=['DELETE'], strict_slashes=False)
 def logout() -> str:
     """
-    Log out a user by invalidating their session.
+    Log out a user by invalidating the session of this client only.
 
     Returns:
         Redirect to the home page or 403 if no valid session is found.
@@ -82,7 +112,7 @@ def logout() -> str:
     if user is None:
         abort(403, description="Session not found")
 
-    AUTH.destroy_session(user.id)
+    AUTH.end_session(session_id)
     response = jsonify({'message': 'logout successful'})
     response.delete_cookie('session_id')
     return redirect('/', code=302)
@@ -152,5 +182,16 @@ def reset_password() -> str:
         abort(403, description="Invalid reset token")
 
 
+@app.route('/metrics/hashing', methods=['GET'], strict_slashes=False)
+def hashing_metrics() -> str:
+    """
+    Report the load and timings of the bcrypt worker pool.
+
+    Returns:
+        JSON response with queue-wait and hash-time metrics.
+    """
+    return jsonify(AUTH.hashing.metrics()), 200
+
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000)
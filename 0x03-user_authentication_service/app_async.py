@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Asyncio (ASGI) variant of the user authentication app, built on Quart.
+
+Serves the same routes as app.py. Run it with an ASGI server, e.g.
+`hypercorn app_async:app --bind 0.0.0.0:5001`.
+"""
+from quart import Quart, request, abort, jsonify, redirect
+from async_auth import AsyncAuth
+from hashing import PoolSaturated
+
+app = Quart(__name__)
+AUTH = AsyncAuth()
+
+
+@app.before_serving
+async def open_db() -> None:
+    """
+    Bring the database schema up to date before the first request.
+    """
+    await AUTH.init()
+
+
+@app.after_serving
+async def close_db() -> None:
+    """
+    Release the database connections on shutdown.
+    """
+    await AUTH.close()
+
+
+@app.errorhandler(PoolSaturated)
+async def hashing_saturated(error: PoolSaturated) -> str:
+    """
+    Turn a full hashing pool into a fast 503.
+
+    Args:
+        error (PoolSaturated): The rejection, with its retry estimate.
+
+    Returns:
+        JSON response with status 503 and a Retry-After header.
+    """
+    response = jsonify({'message': 'server busy, retry later'})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+
+@app.route('/', methods=['GET'], strict_slashes=False)
+async def index() -> str:
+    """
+    Welcome route.
+
+    Returns:
+        JSON response with a welcome message.
+    """
+    return jsonify({'message': 'Bienvenue'})
+
+
+@app.route('/users', methods=['POST'], strict_slashes=False)
+async def register_user() -> str:
+    """
+    Register a new user.
+
+    Returns:
+        JSON response indicating success or failure.
+    """
+    form = await request.form
+    email = form.get('email')
+    password = form.get('password')
+
+    if not email or not password:
+        abort(400, description="Email and password are required")
+
+    try:
+        await AUTH.register_user(email, password)
+        return jsonify({'email': email, 'message': 'user created'}), 201
+    except ValueError:
+        return jsonify({'message': 'email already registered'}), 400
+
+
+@app.route('/sessions', methods=['POST'], strict_slashes=False)
+async def login() -> str:
+    """
+    Log in a user.
+
+    Returns:
+        JSON response with session information or 401 on failure.
+    """
+    form = await request.form
+    email = form.get('email')
+    password = form.get('password')
+
+    if not await AUTH.valid_login(email, password):
+        abort(401, description="Invalid credentials")
+
+    session_id = await AUTH.create_session(email)
+    response = jsonify({'email': email, 'message': 'logged in'})
+    response.set_cookie('session_id', session_id)
+    return response
+
+
+@app.route('/sessions', methods=['DELETE'], strict_slashes=False)
+async def logout() -> str:
+    """
+    Log out a user by invalidating the session of this client only.
+
+    Returns:
+        Redirect to the home page or 403 if no valid session is found.
+    """
+    session_id = request.cookies.get('session_id')
+    user = await AUTH.get_user_from_session_id(session_id)
+
+    if user is None:
+        abort(403, description="Session not found")
+
+    await AUTH.end_session(session_id)
+    return redirect('/', code=302)
+
+
+@app.route('/profile', methods=['GET'], strict_slashes=False)
+async def get_profile() -> str:
+    """
+    Retrieve the profile of the logged-in user.
+
+    Returns:
+        JSON response with the user's email or 403 if not logged in.
+    """
+    session_id = request.cookies.get('session_id')
+    user = await AUTH.get_user_from_session_id(session_id)
+
+    if user is None:
+        abort(403, description="No valid session")
+
+    return jsonify({'email': user.email}), 200
+
+
+@app.route('/reset_password', methods=['POST'], strict_slashes=False)
+async def request_password_reset() -> str:
+    """
+    Request a password reset token for a user.
+
+    Returns:
+        JSON response with the reset token or 403 if the email is invalid.
+    """
+    form = await request.form
+    email = form.get('email')
+
+    try:
+        reset_token = await AUTH.get_reset_password_token(email)
+        return jsonify({'email': email, 'reset_token': reset_token}), 200
+    except ValueError:
+        abort(403, description="Invalid email")
+
+
+@app.route('/reset_password', methods=['PUT'], strict_slashes=False)
+async def reset_password() -> str:
+    """
+    Reset a user's password using a reset token.
+
+    Returns:
+        JSON response indicating success or 403 on failure.
+    """
+    form = await request.form
+    email = form.get('email')
+    reset_token = form.get('reset_token')
+    new_password = form.get('new_password')
+
+    if not email or not reset_token or not new_password:
+        abort(400, description="Email, reset token, and new password "
+                               "are required")
+
+    try:
+        await AUTH.update_password(reset_token, new_password)
+        return jsonify({'email': email, 'message': 'Password updated'}), 200
+    except ValueError:
+        abort(403, description="Invalid reset token")
+
+
+@app.route('/metrics/hashing', methods=['GET'], strict_slashes=False)
+async def hashing_metrics() -> str:
+    """
+    Report the load and timings of the bcrypt worker pool.
+
+    Returns:
+        JSON response with queue-wait and hash-time metrics.
+    """
+    return jsonify(AUTH.hashing.metrics()), 200
+
+
+if __name__ == "__main__":
+    app.run(host="0.0.0.0", port=5001)
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""Asyncio authentication module mirroring `Auth` on top of `AsyncDB`."""
+
+import asyncio
+from datetime import datetime, timedelta
+from itertools import count
+from os import getenv
+from typing import Any, Callable, Optional, Union
+
+import bcrypt
+from sqlalchemy.orm.exc import NoResultFound
+
+from async_db import AsyncDB
+from auth import _bcrypt_rounds, _generate_uuid, _hash_password, _hash_rounds
+from hashing import HashingPool, PoolSaturated
+from user import User
+
+
+class AsyncAuth:
+    """Class for managing authentication and user operations from asyncio."""
+
+    def __init__(self) -> None:
+        """
+        Initialize an instance of the `AsyncAuth` class.
+
+        Reads the same settings as `Auth`. bcrypt runs on `hashing`, a
+        bounded `HashingPool`, so the event loop never blocks on it.
+        """
+        self._db = AsyncDB()
+        try:
+            self.session_duration = int(getenv("SESSION_DURATION", "0"))
+        except ValueError:
+            self.session_duration = 0
+        self.purge_every = max(1, int(getenv("SESSION_PURGE_EVERY", "1000")))
+        self._logins = count(1)
+        self.hashing = HashingPool()
+        self._rounds = None
+
+    async def init(self) -> None:
+        """
+        Bring the database schema up to date and resolve the bcrypt cost.
+        Call once at startup.
+
+        With `BCRYPT_TARGET_MS` the cost comes from a calibration that
+        runs for seconds, so it runs in an executor, never on the loop.
+        """
+        await self._db.init()
+        loop = asyncio.get_running_loop()
+        self._rounds = await loop.run_in_executor(None, _bcrypt_rounds)
+
+    async def close(self) -> None:
+        """
+        Release the database connections. Call once at shutdown.
+        """
+        await self._db.close()
+
+    async def _hash(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run a bcrypt call on the hashing pool without blocking the loop.
+
+        Args:
+            func (Callable): The bcrypt function.
+            *args: Arguments passed to `func`.
+
+        Returns:
+            Any: What `func` returned.
+
+        Raises:
+            PoolSaturated: If the hashing pool is full.
+        """
+        return await asyncio.wrap_future(self.hashing.submit(func, *args))
+
+    async def register_user(self, email: str, password: str) -> User:
+        """
+        Register a new user in the database.
+
+        Args:
+            email (str): Email address of the user.
+            password (str): Plaintext password for the user.
+
+        Returns:
+            User: The created `User` object.
+
+        Raises:
+            ValueError: If a user with the given email already exists.
+            PoolSaturated: If the hashing pool is full.
+        """
+        try:
+            await self._db.find_user_by(email=email)
+            raise ValueError(f"User {email} already exists")
+        except NoResultFound:
+            hashed_password = await self._hash(_hash_password, password)
+            return await self._db.add_user(email, hashed_password)
+
+    async def valid_login(self, email: str, password: str) -> bool:
+        """
+        Validate user login credentials, rehashing weaker passwords.
+
+        The rehash is skipped when the hashing pool is full; it is retried
+        on a later login.
+
+        Args:
+            email (str): The user's email.
+            password (str): The plaintext password to verify.
+
+        Returns:
+            bool: `True` if credentials are valid, `False` otherwise.
+
+        Raises:
+            PoolSaturated: If the hashing pool cannot check the password.
+        """
+        try:
+            user = await self._db.find_user_by(email=email)
+        except NoResultFound:
+            return False
+
+        if not await self._hash(bcrypt.checkpw, password.encode('utf-8'),
+                                user.hashed_password):
+            return False
+
+        if _hash_rounds(user.hashed_password) < self._rounds:
+            try:
+                hashed_password = await self._hash(_hash_password, password)
+            except PoolSaturated:
+                return True
+            await self._db.update_user(user.id,
+                                       hashed_password=hashed_password)
+        return True
+
+    def _session_expiry(self) -> Optional[datetime]:
+        """
+        Compute the expiry of a session created now.
+
+        Returns:
+            Optional[datetime]: UTC expiry, or `None` if sessions never expire.
+        """
+        if self.session_duration <= 0:
+            return None
+        return datetime.utcnow() + timedelta(seconds=self.session_duration)
+
+    async def create_session(self, email: str) -> Union[None, str]:
+        """
+        Create a new session for a user and store the session ID.
+
+        Args:
+            email (str): The user's email address.
+
+        Returns:
+            Union[None, str]: The session ID if the user is found,
+            otherwise `None`.
+        """
+        session_id = _generate_uuid()
+        if not await self._db.create_user_session(email, session_id,
+                                                  self._session_expiry()):
+            return None
+        if next(self._logins) % self.purge_every == 0:
+            await self._db.purge_expired_sessions()
+        return session_id
+
+    async def get_user_from_session_id(
+            self, session_id: str) -> Union[None, User]:
+        """
+        Retrieve a user using their session ID.
+
+        Args:
+            session_id (str): The session ID.
+
+        Returns:
+            Union[None, User]: The user associated with a live session,
+            or `None`.
+        """
+        if session_id is None:
+            return None
+
+        try:
+            return await self._db.find_user_by_session(session_id)
+        except NoResultFound:
+            return None
+
+    async def end_session(self, session_id: str) -> bool:
+        """
+        Invalidate a single session, leaving the user's others alone.
+
+        Args:
+            session_id (str): The session ID.
+
+        Returns:
+            bool: `True` if the session existed, `False` otherwise.
+        """
+        if session_id is None:
+            return False
+        return await self._db.delete_session(session_id)
+
+    async def destroy_session(self, user_id: int) -> None:
+        """
+        Invalidate every session of a user.
+
+        Args:
+            user_id (int): The user's ID.
+        """
+        await self._db.delete_user_sessions(user_id)
+
+    async def get_reset_password_token(self, email: str) -> str:
+        """
+        Generate a password reset token for a user.
+
+        Args:
+            email (str): The user's email address.
+
+        Returns:
+            str: The generated reset token.
+
+        Raises:
+            ValueError: If no user with the given email is found.
+        """
+        reset_token = _generate_uuid()
+        if not await self._db.update_user_by_email(email,
+                                                   reset_token=reset_token):
+            raise ValueError("User not found")
+        return reset_token
+
+    async def update_password(self, reset_token: str, password: str) -> None:
+        """
+        Update a user's password using a valid reset token.
+
+        Args:
+            reset_token (str): The password reset token.
+            password (str): The new plaintext password.
+
+        Raises:
+            ValueError: If the reset token is invalid or not found.
+            PoolSaturated: If the hashing pool is full.
+        """
+        try:
+            user = await self._db.find_user_by(reset_token=reset_token)
+        except NoResultFound:
+            raise ValueError("Invalid reset token")
+
+        hashed_password = await self._hash(_hash_password, password)
+        await self._db.update_user(user.id, hashed_password=hashed_password,
+                                   reset_token=None)
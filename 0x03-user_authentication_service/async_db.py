@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""Asyncio database module mirroring `DB` on SQLAlchemy's asyncio extension.
+
+Requires SQLAlchemy 1.4+ with greenlet, and an async driver such as
+aiosqlite for the default `sqlite+aiosqlite:///a.db`.
+"""
+
+from datetime import datetime
+from os import getenv
+from typing import Optional
+
+from sqlalchemy import delete, event, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm.exc import NoResultFound
+from sqlalchemy.exc import InvalidRequestError
+
+from db import (USER_COLUMNS, _hash_token, _insert_session,
+                _set_sqlite_pragmas, migrate_schema)
+from user import Base, User, UserSession
+
+DEFAULT_ASYNC_DATABASE_URL = "sqlite+aiosqlite:///a.db"
+
+
+class AsyncDB:
+    """Class to interact with the database from asyncio code."""
+
+    def __init__(self, database_url: Optional[str] = None,
+                 reset: bool = False) -> None:
+        """
+        Creates the engine. Call `init` before the first query.
+
+        Args:
+            database_url (str, optional): Async SQLAlchemy URL of the
+                database. Defaults to `AUTH_ASYNC_DB_URL`, then
+                `sqlite+aiosqlite:///a.db`.
+            reset (bool): Drop every table first. Also enabled by
+                `AUTH_DB_RESET=1`.
+        """
+        url = database_url or getenv("AUTH_ASYNC_DB_URL",
+                                     DEFAULT_ASYNC_DATABASE_URL)
+        self._reset = reset or getenv("AUTH_DB_RESET") == "1"
+        self._engine = create_async_engine(url, echo=False)
+        if url.startswith("sqlite"):
+            event.listen(self._engine.sync_engine, "connect",
+                         _set_sqlite_pragmas)
+        self._sessionmaker = sessionmaker(self._engine, class_=AsyncSession,
+                                          expire_on_commit=False)
+
+    async def init(self) -> None:
+        """
+        Brings the schema up to date with the same migrations as `DB`.
+        """
+        async with self._engine.begin() as connection:
+            if self._reset:
+                await connection.run_sync(Base.metadata.drop_all)
+            await connection.run_sync(migrate_schema)
+
+    async def close(self) -> None:
+        """
+        Closes every pooled connection.
+        """
+        await self._engine.dispose()
+
+    async def add_user(self, email: str, hashed_password: str) -> User:
+        """
+        Adds a new user to the database.
+
+        Args:
+            email (str): The user's email address.
+            hashed_password (str): The hashed password for the user.
+
+        Returns:
+            User: The newly created `User` object.
+        """
+        new_user = User(email=email, hashed_password=hashed_password)
+        async with self._sessionmaker() as session:
+            session.add(new_user)
+            await session.commit()
+        return new_user
+
+    async def find_user_by(self, **kwargs) -> User:
+        """
+        Finds the first user that matches the given filter criteria.
+
+        Args:
+            **kwargs: Arbitrary keyword arguments to filter users.
+
+        Returns:
+            User: The user object matching the filters.
+
+        Raises:
+            NoResultFound: If no user matches the criteria.
+            InvalidRequestError: If the query is malformed.
+        """
+        async with self._sessionmaker() as session:
+            try:
+                result = await session.execute(
+                    select(User).filter_by(**kwargs))
+                return result.scalars().one()
+            except NoResultFound as e:
+                raise NoResultFound(
+                    f"No user found with criteria: {kwargs}") from e
+            except InvalidRequestError as e:
+                raise InvalidRequestError("Invalid filter arguments.") from e
+
+    async def update_users_where(self, criteria: dict, values: dict) -> int:
+        """
+        Updates every user matching `criteria` with one UPDATE statement.
+
+        Args:
+            criteria (dict): Column equality filters, e.g. `{"id": 1}`.
+            values (dict): Column values to set.
+
+        Returns:
+            int: Number of users matched.
+
+        Raises:
+            ValueError: If a key of `values` is not a column of `users`.
+        """
+        for attribute in values:
+            if attribute not in USER_COLUMNS:
+                raise ValueError(f"Invalid attribute: {attribute}")
+        async with self._sessionmaker() as session:
+            if not values:
+                result = await session.execute(
+                    select(User.id).filter_by(**criteria))
+                return len(result.all())
+            result = await session.execute(
+                update(User).filter_by(**criteria).values(**values))
+            await session.commit()
+            return result.rowcount
+
+    async def update_user(self, user_id: int, **kwargs) -> None:
+        """
+        Updates a user's attributes in the database.
+
+        Args:
+            user_id (int): The ID of the user to update.
+            **kwargs: Arbitrary keyword arguments for fields to update.
+
+        Raises:
+            ValueError: If an attribute in `kwargs` is invalid or does not
+                exist.
+            NoResultFound: If no user has this ID.
+        """
+        if await self.update_users_where({"id": user_id}, kwargs) == 0:
+            raise NoResultFound(
+                f"No user found with criteria: {{'id': {user_id}}}")
+
+    async def update_user_by_email(self, email: str, **kwargs) -> bool:
+        """
+        Updates the attributes of the user with the given email.
+
+        Args:
+            email (str): Email address of the user to update.
+            **kwargs: Arbitrary keyword arguments for fields to update.
+
+        Returns:
+            bool: `True` if a user with this email exists, `False` otherwise.
+        """
+        return await self.update_users_where({"email": email}, kwargs) > 0
+
+    async def create_user_session(
+            self, email: str, session_id: str,
+            expires_at: Optional[datetime] = None) -> bool:
+        """
+        Stores a new session for the user with the given email.
+
+        Args:
+            email (str): Email address of the user logging in.
+            session_id (str): Session ID handed to the client.
+            expires_at (datetime, optional): UTC expiry, `None` for never.
+
+        Returns:
+            bool: `True` if a user with this email exists, `False` otherwise.
+        """
+        async with self._sessionmaker() as session:
+            result = await session.execute(
+                _insert_session(email, session_id, expires_at))
+            await session.commit()
+        return result.rowcount > 0
+
+    async def find_user_by_session(self, session_id: str) -> User:
+        """
+        Finds the user owning a live session with one indexed join.
+
+        Args:
+            session_id (str): Session ID presented by the client.
+
+        Returns:
+            User: The user the session belongs to.
+
+        Raises:
+            NoResultFound: If the session is unknown or has expired.
+        """
+        statement = select(User).join(
+            UserSession, UserSession.user_id == User.id
+        ).where(
+            UserSession.token_hash == _hash_token(session_id),
+            or_(UserSession.expires_at.is_(None),
+                UserSession.expires_at > datetime.utcnow()),
+        )
+        async with self._sessionmaker() as session:
+            try:
+                return (await session.execute(statement)).scalars().one()
+            except NoResultFound as e:
+                raise NoResultFound("No user found for this session") from e
+
+    async def delete_session(self, session_id: str) -> bool:
+        """
+        Deletes one session.
+
+        Args:
+            session_id (str): Session ID presented by the client.
+
+        Returns:
+            bool: `True` if the session existed, `False` otherwise.
+        """
+        async with self._sessionmaker() as session:
+            result = await session.execute(delete(UserSession).where(
+                UserSession.token_hash == _hash_token(session_id)))
+            await session.commit()
+        return result.rowcount > 0
+
+    async def delete_user_sessions(self, user_id: int) -> int:
+        """
+        Deletes every session of a user.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            int: Number of sessions deleted.
+        """
+        async with self._sessionmaker() as session:
+            result = await session.execute(delete(UserSession).where(
+                UserSession.user_id == user_id))
+            await session.commit()
+        return result.rowcount
+
+    async def purge_expired_sessions(self, batch_size: int = 1000) -> int:
+        """
+        Deletes expired sessions in batches of at most `batch_size` rows.
+
+        Args:
+            batch_size (int): Maximum number of rows deleted per statement.
+
+        Returns:
+            int: Number of sessions deleted.
+        """
+        now = datetime.utcnow()
+        purged = 0
+        async with self._sessionmaker() as session:
+            while True:
+                ids = (await session.execute(
+                    select(UserSession.id).where(
+                        UserSession.expires_at <= now).limit(batch_size)
+                )).scalars().all()
+                if not ids:
+                    return purged
+                result = await session.execute(delete(UserSession).where(
+                    UserSession.id.in_(ids)))
+                await session.commit()
+                purged += result.rowcount
+                if len(ids) < batch_size:
+                    return purged
@@ -1,12 +1,75 @@
 #!/usr/bin/env python3
 """Authentication module providing user management and password handling."""
 
+from datetime import datetime, timedelta
+from functools import lru_cache
+from itertools import count
+from os import getenv
+from time import perf_counter
 from uuid import uuid4
 import bcrypt
 from db import DB
+from hashing import HashingPool, PoolSaturated
 from user import User
 from sqlalchemy.orm.exc import NoResultFound
-from typing import Union
+from typing import Optional, Union
+
+
+def calibrate_bcrypt_rounds(target_ms: float, min_rounds: int = 4,
+                            max_rounds: int = 16) -> int:
+    """
+    Find the highest bcrypt cost that hashes within a latency budget.
+
+    Each extra round doubles the work, so hashing stops at the first cost
+    that exceeds the budget.
+
+    Args:
+        target_ms (float): Maximum time one hash may take, in milliseconds.
+        min_rounds (int): Lowest cost ever returned.
+        max_rounds (int): Highest cost tried.
+
+    Returns:
+        int: The selected cost factor.
+    """
+    best = min_rounds
+    for rounds in range(min_rounds, max_rounds + 1):
+        start = perf_counter()
+        bcrypt.hashpw(b"calibration", bcrypt.gensalt(rounds))
+        if (perf_counter() - start) * 1000 > target_ms:
+            break
+        best = rounds
+    return best
+
+
+@lru_cache(maxsize=None)
+def _bcrypt_rounds() -> int:
+    """
+    Cost factor for new password hashes.
+
+    Returns:
+        int: `BCRYPT_ROUNDS` if set, else a one-off calibration against
+        `BCRYPT_TARGET_MS` if set, else bcrypt's default of 12.
+    """
+    if getenv("BCRYPT_ROUNDS"):
+        return int(getenv("BCRYPT_ROUNDS"))
+    if getenv("BCRYPT_TARGET_MS"):
+        return calibrate_bcrypt_rounds(float(getenv("BCRYPT_TARGET_MS")))
+    return 12
+
+
+def _hash_rounds(hashed_password: bytes) -> int:
+    """
+    Read the cost factor out of a bcrypt hash.
+
+    Args:
+        hashed_password (bytes): A hash of the form `$2b$<cost>$...`.
+
+    Returns:
+        int: The cost factor the hash was made with.
+    """
+    if isinstance(hashed_password, str):
+        hashed_password = hashed_password.encode('utf-8')
+    return int(hashed_password.split(b'$')[2])
 
 
 def _hash_password(password: str) -> bytes:
@@ -19,7 +82,8 @@ def _hash_password(password: str) -> bytes:
     Returns:
         bytes: The hashed password.
     """
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+    return bcrypt.hashpw(password.encode('utf-8'),
+                         bcrypt.gensalt(_bcrypt_rounds()))
 
 
 def _generate_uuid() -> str:
@@ -38,8 +102,27 @@ class Auth:
     def __init__(self) -> None:
         """
         Initialize an instance of the `Auth` class.
+
+        Sessions last `SESSION_DURATION` seconds (0 or unset: forever).
+        Every `SESSION_PURGE_EVERY` logins, expired sessions are purged.
+        bcrypt runs on `hashing`, a bounded `HashingPool`.
         """
         self._db = DB()
+        self.hashing = HashingPool()
+        try:
+            self.session_duration = int(getenv("SESSION_DURATION", "0"))
+        except ValueError:
+            self.session_duration = 0
+        self.purge_every = max(1, int(getenv("SESSION_PURGE_EVERY", "1000")))
+        self._logins = count(1)
+
+    def close_session(self) -> None:
+        """
+        Release the database session of the calling thread.
+
+        Meant to be called at the end of each request.
+        """
+        self._db.close_session()
 
     def register_user(self, email: str, password: str) -> User:
         """
@@ -54,49 +137,80 @@ class Auth:
 
         Raises:
             ValueError: If a user with the given email already exists.
+            PoolSaturated: If the hashing pool is full.
         """
         try:
             self._db.find_user_by(email=email)
             raise ValueError(f"User {email} already exists")
         except NoResultFound:
-            hashed_password = _hash_password(password)
+            hashed_password = self.hashing.run(_hash_password, password)
             return self._db.add_user(email, hashed_password)
 
     def valid_login(self, email: str, password: str) -> bool:
         """
         Validate user login credentials.
 
+        A password stored with a lower cost than the current one is
+        rehashed and saved, so existing users follow cost increases.
+        Stronger hashes are kept as they are. The rehash is skipped when
+        the hashing pool is full; it is retried on a later login.
+
         Args:
             email (str): The user's email.
             password (str): The plaintext password to verify.
 
         Returns:
             bool: `True` if credentials are valid, `False` otherwise.
+
+        Raises:
+            PoolSaturated: If the hashing pool cannot check the password.
         """
         try:
             user = self._db.find_user_by(email=email)
         except NoResultFound:
             return False
 
-        return bcrypt.checkpw(password.encode('utf-8'), user.hashed_password)
+        if not self.hashing.run(bcrypt.checkpw, password.encode('utf-8'),
+                                user.hashed_password):
+            return False
+
+        if _hash_rounds(user.hashed_password) < _bcrypt_rounds():
+            try:
+                hashed_password = self.hashing.run(_hash_password, password)
+            except PoolSaturated:
+                return True
+            self._db.update_user(user.id, hashed_password=hashed_password)
+        return True
+
+    def _session_expiry(self) -> Optional[datetime]:
+        """
+        Compute the expiry of a session created now.
+
+        Returns:
+            Optional[datetime]: UTC expiry, or `None` if sessions never expire.
+        """
+        if self.session_duration <= 0:
+            return None
+        return datetime.utcnow() + timedelta(seconds=self.session_duration)
 
     def create_session(self, email: str) -> Union[None, str]:
         """
         Create a new session for a user and store the session ID.
 
+        The user's sessions on other devices stay valid.
+
         Args:
             email (str): The user's email address.
 
         Returns:
             Union[None, str]: The session ID if the user is found, otherwise `None`.
         """
-        try:
-            user = self._db.find_user_by(email=email)
-        except NoResultFound:
-            return None
-
         session_id = _generate_uuid()
-        self._db.update_user(user.id, session_id=session_id)
+        if not self._db.create_user_session(email, session_id,
+                                            self._session_expiry()):
+            return None
+        if next(self._logins) % self.purge_every == 0:
+            self._db.purge_expired_sessions()
         return session_id
 
     def get_user_from_session_id(self, session_id: str) -> Union[None, User]:
@@ -107,19 +221,34 @@ class Auth:
             session_id (str): The session ID.
 
         Returns:
-            Union[None, User]: The user associated with the session ID, or `None`.
+            Union[None, User]: The user associated with a live session,
+            or `None`.
         """
         if session_id is None:
             return None
 
         try:
-            return self._db.find_user_by(session_id=session_id)
+            return self._db.find_user_by_session(session_id)
         except NoResultFound:
             return None
 
+    def end_session(self, session_id: str) -> bool:
+        """
+        Invalidate a single session, leaving the user's others alone.
+
+        Args:
+            session_id (str): The session ID.
+
+        Returns:
+            bool: `True` if the session existed, `False` otherwise.
+        """
+        if session_id is None:
+            return False
+        return self._db.delete_session(session_id)
+
     def destroy_session(self, user_id: int) -> None:
         """
-        Invalidate a user's session by clearing the session ID.
+        Invalidate every session of a user.
 
         Args:
             user_id (int): The user's ID.
@@ -127,7 +256,7 @@ class Auth:
         Returns:
             None
         """
-        self._db.update_user(user_id, session_id=None)
+        self._db.delete_user_sessions(user_id)
 
     def get_reset_password_token(self, email: str) -> str:
         """
@@ -142,13 +271,9 @@ class Auth:
         Raises:
             ValueError: If no user with the given email is found.
         """
-        try:
-            user = self._db.find_user_by(email=email)
-        except NoResultFound:
-            raise ValueError("User not found")
-
         reset_token = _generate_uuid()
-        self._db.update_user(user.id, reset_token=reset_token)
+        if not self._db.update_user_by_email(email, reset_token=reset_token):
+            raise ValueError("User not found")
         return reset_token
 
     def update_password(self, reset_token: str, password: str) -> None:
@@ -164,11 +289,12 @@ class Auth:
 
         Raises:
             ValueError: If the reset token is invalid or not found.
+            PoolSaturated: If the hashing pool is full.
         """
         try:
             user = self._db.find_user_by(reset_token=reset_token)
         except NoResultFound:
             raise ValueError("Invalid reset token")
 
-        hashed_password = _hash_password(password)
+        hashed_password = self.hashing.run(_hash_password, password)
         self._db.update_user(user.id, hashed_password=hashed_password, reset_token=None)
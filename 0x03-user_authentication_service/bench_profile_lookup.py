@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Profile lookup benchmark: fills a temporary SQLite database with users,
+half of them logged in, and times DB.find_user_by_session(...) and
+DB.find_user_by(reset_token=...) without and then with the reset_token
+index. The session lookup goes through the unique token_hash index of
+the sessions table, which cannot be dropped, so it is indexed in both
+runs.
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+
+from db import DB, _hash_token
+
+USERS = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+LOOKUPS = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+
+def generate(path: str, count: int) -> list:
+    """
+    Inserts count users, and a session for every other one, straight
+    through sqlite3.
+
+    Args:
+        path (str): Path of the SQLite file.
+        count (int): Number of users to insert.
+
+    Returns:
+        list: (session_id, reset_token) pairs of a sample of the users.
+    """
+    rows = []
+    for i in range(count):
+        rows.append((
+            "user{}@hbtn.io".format(i),
+            "$2b$12$" + "0" * 53,
+            str(uuid.uuid4()) if i % 2 == 0 else None,
+            str(uuid.uuid4()) if i % 10 == 0 else None,
+        ))
+    connection = sqlite3.connect(path)
+    with connection:
+        connection.executemany(
+            "INSERT INTO users (id, email, hashed_password, reset_token)"
+            " VALUES (?, ?, ?, ?)",
+            [(i + 1, row[0], row[1], row[3]) for i, row in enumerate(rows)])
+        connection.executemany(
+            "INSERT INTO sessions (user_id, token_hash, created_at)"
+            " VALUES (?, ?, datetime('now'))",
+            [(i + 1, _hash_token(row[2]))
+             for i, row in enumerate(rows) if row[2] is not None])
+    connection.close()
+    step = max(10, count // LOOKUPS // 10 * 10)
+    return [(row[2], row[3]) for row in rows[::step]][:LOOKUPS]
+
+
+def set_indexes(path: str, enabled: bool) -> None:
+    """
+    Drops or rebuilds the reset_token index.
+
+    Args:
+        path (str): Path of the SQLite file.
+        enabled (bool): Whether the index should exist afterwards.
+    """
+    connection = sqlite3.connect(path)
+    with connection:
+        if enabled:
+            connection.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS ix_users_reset_token"
+                " ON users (reset_token) WHERE reset_token IS NOT NULL")
+        else:
+            connection.execute("DROP INDEX IF EXISTS ix_users_reset_token")
+    connection.close()
+
+
+def timed(label: str, name: str, lookup, values: list) -> None:
+    """
+    Prints the mean time of lookup over values.
+
+    Args:
+        label (str): Label of the run.
+        name (str): Name of the lookup.
+        lookup: Callable(value) finding one user.
+        values (list): Values to look up.
+    """
+    start = time.perf_counter()
+    for value in values:
+        lookup(value)
+    elapsed = time.perf_counter() - start
+    print("{:<10} {:<12} {:>10.3f}ms/lookup  ({} lookups)".format(
+        label, name, elapsed * 1000 / len(values), len(values)))
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        url = "sqlite:///" + path
+        DB(url)
+        samples = generate(path, USERS)
+        session_ids = [s for s, _ in samples if s is not None]
+        reset_tokens = [r for _, r in samples if r is not None]
+        for label, enabled in (("no index", False), ("index", True)):
+            set_indexes(path, enabled)
+            db = DB(url)
+            timed(label, "session", db.find_user_by_session, session_ids)
+            timed(label, "reset_token",
+                  lambda token: db.find_user_by(reset_token=token),
+                  reset_tokens)
+            db.close_session()
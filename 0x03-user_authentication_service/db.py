@@ -1,42 +1,240 @@
 #!/usr/bin/env python3
 """Database module to manage User operations."""
 
-from sqlalchemy import create_engine
+from datetime import datetime
+from hashlib import sha256
+from os import getenv
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy import (Column, Integer, Table, create_engine, event, inspect,
+                        literal, or_, select, text)
+from sqlalchemy.sql.expression import Insert
+from sqlalchemy.engine import Connection, Engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.orm import scoped_session, sessionmaker, Session
+from sqlalchemy.pool import StaticPool
 from sqlalchemy.orm.exc import NoResultFound
 from sqlalchemy.exc import InvalidRequestError
 
-from user import Base, User
+from user import Base, User, UserSession
+
+DEFAULT_DATABASE_URL = "sqlite:///a.db"
+
+# Column names update_user may set, read once from the mapped table
+USER_COLUMNS = frozenset(column.key for column in User.__table__.columns)
+
+# Single-row table recording which migrations a database has had
+schema_version = Table(
+    "schema_version", Base.metadata,
+    Column("version", Integer, nullable=False),
+)
+
+# Version of the schema as created by the models when no migration ran
+BASELINE_VERSION = 1
+
+
+def _hash_token(token: str) -> str:
+    """
+    Digests a session ID for storage in the sessions table.
+
+    Args:
+        token (str): The session ID handed to the client.
+
+    Returns:
+        str: Hex SHA-256 digest of the session ID.
+    """
+    return sha256(token.encode('utf-8')).hexdigest()
+
+
+def _insert_session(email: str, session_id: str,
+                    expires_at: Optional[datetime]) -> Insert:
+    """
+    Builds the INSERT ... SELECT storing a session for a user by email.
+
+    Args:
+        email (str): Email address of the user logging in.
+        session_id (str): Session ID handed to the client.
+        expires_at (datetime, optional): UTC expiry, `None` for never.
+
+    Returns:
+        Insert: Inserts one row, or none if no user has this email.
+    """
+    columns = UserSession.__table__.c
+    return UserSession.__table__.insert().from_select(
+        ["user_id", "token_hash", "created_at", "expires_at"],
+        select(User.id,
+               literal(_hash_token(session_id), columns.token_hash.type),
+               literal(datetime.utcnow(), columns.created_at.type),
+               literal(expires_at, columns.expires_at.type)
+               ).where(User.email == email))
+
+
+def _create_token_indexes(connection: Connection) -> None:
+    """
+    Migration 2: adds the session_id and reset_token indexes.
+
+    Args:
+        connection (Connection): Connection inside the migration transaction.
+    """
+    for index in User.__table__.indexes:
+        index.create(connection, checkfirst=True)
+
+
+def _move_sessions_to_table(connection: Connection) -> None:
+    """
+    Migration 3: moves each users.session_id into the sessions table.
+
+    The sessions table itself has just been made by create_all. Moved
+    sessions never expire, as before.
+
+    Args:
+        connection (Connection): Connection inside the migration transaction.
+    """
+    rows = connection.execute(text(
+        "SELECT id, session_id FROM users WHERE session_id IS NOT NULL"
+    )).fetchall()
+    if not rows:
+        return
+    now = datetime.utcnow()
+    connection.execute(UserSession.__table__.insert(), [
+        {"user_id": user_id, "token_hash": _hash_token(session_id),
+         "created_at": now, "expires_at": None}
+        for user_id, session_id in rows
+    ])
+    connection.execute(text("UPDATE users SET session_id = NULL"))
+
+
+# (version, upgrade) pairs applied in order to databases below `version`.
+# Upgrades run after create_all, so they must tolerate tables that
+# create_all has just made.
+MIGRATIONS: List[Tuple[int, Callable[[Connection], None]]] = [
+    (2, _create_token_indexes),
+    (3, _move_sessions_to_table),
+]
+
+SCHEMA_VERSION = max([BASELINE_VERSION] + [v for v, _ in MIGRATIONS])
+
+
+def migrate_schema(connection: Connection) -> None:
+    """
+    Creates missing tables and applies pending migrations.
+
+    A database without a version row is stamped as `SCHEMA_VERSION` if
+    it had no users table (fresh) or `BASELINE_VERSION` otherwise.
+
+    Args:
+        connection (Connection): Connection inside a transaction.
+    """
+    fresh = User.__tablename__ not in inspect(connection).get_table_names()
+    Base.metadata.create_all(connection)
+    current = connection.execute(
+        text("SELECT version FROM schema_version")).scalar()
+    if current is None:
+        current = SCHEMA_VERSION if fresh else BASELINE_VERSION
+        connection.execute(
+            text("INSERT INTO schema_version (version) VALUES (:v)"),
+            {"v": current})
+    for version, upgrade in MIGRATIONS:
+        if version > current:
+            upgrade(connection)
+            current = version
+    connection.execute(
+        text("UPDATE schema_version SET version = :v"), {"v": current})
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """
+    Configures every new SQLite connection for concurrent use.
+
+    WAL lets readers run alongside a writer, synchronous=NORMAL is safe
+    with WAL and avoids an fsync per commit, and busy_timeout makes
+    writers wait for the lock instead of failing at once.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+
+def _create_engine(url: str) -> Engine:
+    """
+    Creates the engine with a connection pool suited to the backend.
+
+    Args:
+        url (str): SQLAlchemy database URL.
+
+    Returns:
+        Engine: A pooled engine. File-based SQLite gets WAL pragmas and may
+        be shared across threads; in-memory SQLite keeps one connection.
+    """
+    if url in ("sqlite://", "sqlite:///:memory:"):
+        return create_engine(url, echo=False, poolclass=StaticPool,
+                             connect_args={"check_same_thread": False})
+
+    options = {
+        "echo": False,
+        "pool_size": int(getenv("AUTH_DB_POOL_SIZE", "5")),
+        "max_overflow": int(getenv("AUTH_DB_MAX_OVERFLOW", "10")),
+        "pool_pre_ping": True,
+    }
+    if url.startswith("sqlite"):
+        options["connect_args"] = {"check_same_thread": False}
+    engine = create_engine(url, **options)
+    if url.startswith("sqlite"):
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+    return engine
 
 
 class DB:
     """Class to interact with the database."""
 
-    def __init__(self) -> None:
+    def __init__(self, database_url: Optional[str] = None,
+                 reset: bool = False) -> None:
         """
-        Initializes the database connection and sets up the schema.
+        Initializes the database connection and brings the schema up to date.
 
-        - Creates an SQLite database `a.db`.
-        - Drops existing tables and recreates them to ensure a clean slate.
+        Existing data is kept: tables are only created when missing and
+        pending migrations are applied once.
+
+        Args:
+            database_url (str, optional): SQLAlchemy URL of the database.
+                Defaults to `AUTH_DB_URL`, then `sqlite:///a.db`.
+            reset (bool): Drop every table first, as the service used to do
+                on each start. Also enabled by `AUTH_DB_RESET=1`.
         """
-        self._engine = create_engine("sqlite:///a.db", echo=False)
-        Base.metadata.drop_all(self._engine)  # Clear existing tables
-        Base.metadata.create_all(self._engine)  # Recreate tables
-        self.__session = None  # Lazy-initialized session object
+        url = database_url or getenv("AUTH_DB_URL", DEFAULT_DATABASE_URL)
+        self._engine = _create_engine(url)
+        if reset or getenv("AUTH_DB_RESET") == "1":
+            Base.metadata.drop_all(self._engine)
+        self._migrate()
+        # Registry handing each thread its own session
+        self.__session = scoped_session(sessionmaker(bind=self._engine))
+
+    def _migrate(self) -> None:
+        """
+        Brings the schema up to date in one transaction.
+        """
+        with self._engine.begin() as connection:
+            migrate_schema(connection)
 
     @property
     def _session(self) -> Session:
         """
-        Provides a memoized session object to interact with the database.
+        Provides the session of the calling thread.
 
         Returns:
-            Session: SQLAlchemy session for database operations.
+            Session: SQLAlchemy session for database operations, created on
+            first use in each thread.
         """
-        if self.__session is None:
-            session_factory = sessionmaker(bind=self._engine)
-            self.__session = session_factory()
-        return self.__session
+        return self.__session()
+
+    def close_session(self) -> None:
+        """
+        Closes the calling thread's session and returns its connection to
+        the pool. The next access to `_session` starts a fresh one.
+        """
+        self.__session.remove()
 
     def add_user(self, email: str, hashed_password: str) -> User:
         """
@@ -75,6 +273,32 @@ class DB:
         except InvalidRequestError as e:
             raise InvalidRequestError("Invalid filter arguments.") from e
 
+    def update_users_where(self, criteria: dict, values: dict) -> int:
+        """
+        Updates every user matching `criteria` with one UPDATE statement.
+
+        No row is loaded; users already in the session are updated in place.
+
+        Args:
+            criteria (dict): Column equality filters, e.g. `{"id": 1}`.
+            values (dict): Column values to set.
+
+        Returns:
+            int: Number of users matched.
+
+        Raises:
+            ValueError: If a key of `values` is not a column of `users`.
+        """
+        for attribute in values:
+            if attribute not in USER_COLUMNS:
+                raise ValueError(f"Invalid attribute: {attribute}")
+        query = self._session.query(User).filter_by(**criteria)
+        if not values:
+            return query.count()
+        matched = query.update(values, synchronize_session="evaluate")
+        self._session.commit()
+        return matched
+
     def update_user(self, user_id: int, **kwargs) -> None:
         """
         Updates a user's attributes in the database.
@@ -84,12 +308,134 @@ class DB:
             **kwargs: Arbitrary keyword arguments for fields to update.
 
         Raises:
-            ValueError: If an attribute in `kwargs` is invalid or does not exist.
+            ValueError: If an attribute in `kwargs` is invalid or does not
+                exist.
+            NoResultFound: If no user has this ID.
         """
-        user = self.find_user_by(id=user_id)
-        for attribute, value in kwargs.items():
-            if hasattr(user, attribute):
-                setattr(user, attribute, value)
-            else:
-                raise ValueError(f"Invalid attribute: {attribute}")
+        if self.update_users_where({"id": user_id}, kwargs) == 0:
+            raise NoResultFound(
+                f"No user found with criteria: {{'id': {user_id}}}")
+
+    def update_user_by_email(self, email: str, **kwargs) -> bool:
+        """
+        Updates the attributes of the user with the given email.
+
+        Args:
+            email (str): Email address of the user to update.
+            **kwargs: Arbitrary keyword arguments for fields to update.
+
+        Returns:
+            bool: `True` if a user with this email exists, `False` otherwise.
+
+        Raises:
+            ValueError: If an attribute in `kwargs` is invalid or does not
+                exist.
+        """
+        return self.update_users_where({"email": email}, kwargs) > 0
+
+    def create_user_session(self, email: str, session_id: str,
+                            expires_at: Optional[datetime] = None) -> bool:
+        """
+        Stores a new session for the user with the given email.
+
+        A single INSERT ... SELECT resolves the user's ID by email and
+        writes one narrow sessions row; no `User` is loaded and the user's
+        other sessions are left alone.
+
+        Args:
+            email (str): Email address of the user logging in.
+            session_id (str): Session ID handed to the client. Only its
+                digest is stored.
+            expires_at (datetime, optional): UTC expiry, `None` for never.
+
+        Returns:
+            bool: `True` if a user with this email exists, `False` otherwise.
+        """
+        result = self._session.execute(
+            _insert_session(email, session_id, expires_at))
+        self._session.commit()
+        return result.rowcount > 0
+
+    def find_user_by_session(self, session_id: str) -> User:
+        """
+        Finds the user owning a live session with one indexed join.
+
+        Args:
+            session_id (str): Session ID presented by the client.
+
+        Returns:
+            User: The user the session belongs to.
+
+        Raises:
+            NoResultFound: If the session is unknown or has expired.
+        """
+        try:
+            return self._session.query(User).join(
+                UserSession, UserSession.user_id == User.id
+            ).filter(
+                UserSession.token_hash == _hash_token(session_id),
+                or_(UserSession.expires_at.is_(None),
+                    UserSession.expires_at > datetime.utcnow()),
+            ).one()
+        except NoResultFound as e:
+            raise NoResultFound("No user found for this session") from e
+
+    def delete_session(self, session_id: str) -> bool:
+        """
+        Deletes one session.
+
+        Args:
+            session_id (str): Session ID presented by the client.
+
+        Returns:
+            bool: `True` if the session existed, `False` otherwise.
+        """
+        deleted = self._session.query(UserSession).filter_by(
+            token_hash=_hash_token(session_id)
+        ).delete(synchronize_session=False)
         self._session.commit()
+        return deleted > 0
+
+    def delete_user_sessions(self, user_id: int) -> int:
+        """
+        Deletes every session of a user.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            int: Number of sessions deleted.
+        """
+        deleted = self._session.query(UserSession).filter_by(
+            user_id=user_id
+        ).delete(synchronize_session=False)
+        self._session.commit()
+        return deleted
+
+    def purge_expired_sessions(self, batch_size: int = 1000) -> int:
+        """
+        Deletes expired sessions in batches of at most `batch_size` rows.
+
+        Each batch is its own short transaction, so a large backlog never
+        holds the write lock for long.
+
+        Args:
+            batch_size (int): Maximum number of rows deleted per statement.
+
+        Returns:
+            int: Number of sessions deleted.
+        """
+        now = datetime.utcnow()
+        purged = 0
+        while True:
+            ids = [row[0] for row in self._session.query(
+                UserSession.id
+            ).filter(UserSession.expires_at <= now).limit(batch_size)]
+            if not ids:
+                return purged
+            purged += self._session.query(UserSession).filter(
+                UserSession.id.in_(ids)
+            ).delete(synchronize_session=False)
+            self._session.commit()
+            if len(ids) < batch_size:
+                return purged
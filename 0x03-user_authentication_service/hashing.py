@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""Bounded worker pool that runs bcrypt off the request threads."""
+
+import math
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from os import cpu_count, getenv
+from time import perf_counter
+from typing import Any, Callable, Dict, Optional
+
+
+class PoolSaturated(Exception):
+    """
+    Raised when the hashing pool has no room for another job.
+
+    Attributes:
+        retry_after (int): Seconds after which the caller may try again.
+    """
+
+    def __init__(self, retry_after: int) -> None:
+        """
+        Initialize the exception.
+
+        Args:
+            retry_after (int): Seconds after which the caller may try again.
+        """
+        super().__init__("Hashing pool is saturated")
+        self.retry_after = retry_after
+
+
+class _Timer:
+    """Running count, total and maximum of a duration, in seconds."""
+
+    def __init__(self) -> None:
+        """Start with no samples."""
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        """
+        Record one sample.
+
+        Args:
+            seconds (float): Duration of the sample.
+        """
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    @property
+    def mean(self) -> float:
+        """float: Mean of the samples, 0 without samples."""
+        return self.total / self.count if self.count else 0.0
+
+    def to_dict(self) -> Dict[str, float]:
+        """
+        Summarize the samples in milliseconds.
+
+        Returns:
+            Dict[str, float]: `count`, `mean_ms` and `max_ms`.
+        """
+        return {"count": self.count,
+                "mean_ms": round(self.mean * 1000, 3),
+                "max_ms": round(self.max * 1000, 3)}
+
+
+class HashingPool:
+    """
+    Runs CPU-heavy password hashing on a fixed set of worker threads.
+
+    bcrypt releases the GIL, so `max_workers` hashes run in parallel. At
+    most `max_queue` more jobs may wait for a worker; past that, `submit`
+    and `run` fail at once with `PoolSaturated` instead of piling up
+    requests, so threads serving cheap routes are not all stuck behind
+    bcrypt.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None,
+                 max_queue: Optional[int] = None) -> None:
+        """
+        Start the pool.
+
+        Args:
+            max_workers (int, optional): Hashes run at once. Defaults to
+                `HASH_POOL_WORKERS`, then the number of CPUs.
+            max_queue (int, optional): Jobs allowed to wait for a worker.
+                Defaults to `HASH_POOL_QUEUE`, then 4 per worker.
+        """
+        if max_workers is None:
+            max_workers = int(getenv("HASH_POOL_WORKERS", cpu_count() or 1))
+        if max_queue is None:
+            max_queue = int(getenv("HASH_POOL_QUEUE", 4 * max_workers))
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self._executor = ThreadPoolExecutor(self.max_workers,
+                                            thread_name_prefix="hashing")
+        self._slots = threading.BoundedSemaphore(self.max_workers +
+                                                 self.max_queue)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._rejected = 0
+        self._queue_wait = _Timer()
+        self._hash_time = _Timer()
+
+    def _retry_after(self) -> int:
+        """
+        Estimate when a slot frees up.
+
+        Returns:
+            int: Seconds for the current backlog to drain, at least 1.
+        """
+        with self._lock:
+            backlog = self._pending * self._hash_time.mean / self.max_workers
+        return max(1, math.ceil(backlog))
+
+    def submit(self, func: Callable[..., Any], *args: Any) -> Future:
+        """
+        Queue `func(*args)` for a worker.
+
+        Args:
+            func (Callable): The hashing function.
+            *args: Arguments passed to `func`.
+
+        Returns:
+            Future: Resolves to what `func` returned.
+
+        Raises:
+            PoolSaturated: If every worker is busy and the queue is full.
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise PoolSaturated(self._retry_after())
+
+        submitted = perf_counter()
+        with self._lock:
+            self._pending += 1
+
+        def job() -> Any:
+            started = perf_counter()
+            try:
+                return func(*args)
+            finally:
+                finished = perf_counter()
+                with self._lock:
+                    self._pending -= 1
+                    self._queue_wait.add(started - submitted)
+                    self._hash_time.add(finished - started)
+                self._slots.release()
+
+        try:
+            return self._executor.submit(job)
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+            self._slots.release()
+            raise
+
+    def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run `func(*args)` on a worker and wait for its result.
+
+        Args:
+            func (Callable): The hashing function.
+            *args: Arguments passed to `func`.
+
+        Returns:
+            Any: What `func` returned.
+
+        Raises:
+            PoolSaturated: If every worker is busy and the queue is full.
+        """
+        return self.submit(func, *args).result()
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Report the pool's configuration, load and timings.
+
+        Returns:
+            Dict[str, Any]: Worker and queue limits, jobs pending, jobs
+            rejected, and queue-wait and hash-time summaries.
+        """
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "pending": self._pending,
+                "rejected": self._rejected,
+                "queue_wait": self._queue_wait.to_dict(),
+                "hash_time": self._hash_time.to_dict(),
+            }
+
+    def shutdown(self) -> None:
+        """Wait for running jobs and stop the workers."""
+        self._executor.shutdown(wait=True)
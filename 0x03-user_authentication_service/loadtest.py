@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Load test comparing the Flask app (app.py) with its ASGI variant
+(app_async.py) on the same machine, using only the standard library on
+the client side.
+
+Each server is started on its own fresh SQLite file, with a hashing queue
+as deep as the number of clients so no request is shed with a 503. Two
+phases then run against each one with the same number of client threads:
+
+- login: every request registers a new user and logs it in (bcrypt-bound)
+- profile: every request reads /profile with a live session (DB-bound)
+
+For each phase, requests/sec and the p50/p99 latencies are printed.
+
+Usage: ./loadtest.py [--clients N] [--requests N] [--rounds R]
+       ./loadtest.py --url http://host:port   (one already-running server)
+"""
+import argparse
+import http.client
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+SERVERS = {
+    "flask": [sys.executable, "-m", "flask", "--app", "app", "run",
+              "--port", "{port}", "--with-threads"],
+    "asgi": [sys.executable, "-m", "hypercorn", "app_async:app",
+             "--bind", "127.0.0.1:{port}"],
+}
+
+
+class Client:
+    """
+    One keep-alive HTTP connection, reopened after errors.
+    """
+
+    def __init__(self, url: str) -> None:
+        """
+        Args:
+            url (str): Base URL of the server.
+        """
+        parsed = urllib.parse.urlsplit(url)
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.connection = None
+
+    def request(self, method: str, path: str, form: Optional[dict] = None,
+                cookie: Optional[str] = None) -> Tuple[int, dict]:
+        """
+        Sends one request and reads the whole response.
+
+        Args:
+            method (str): HTTP method.
+            path (str): Request path.
+            form (dict, optional): Form fields to send urlencoded.
+            cookie (str, optional): session_id cookie to send.
+
+        Returns:
+            Tuple[int, dict]: Status code and response headers.
+        """
+        headers = {}
+        body = None
+        if form is not None:
+            body = urllib.parse.urlencode(form)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        if cookie is not None:
+            headers["Cookie"] = "session_id=" + cookie
+        if self.connection is None:
+            self.connection = http.client.HTTPConnection(
+                self.host, self.port, timeout=60)
+        try:
+            self.connection.request(method, path, body, headers)
+            response = self.connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            self.connection = None
+            raise
+        return response.status, dict(response.getheaders())
+
+
+def session_cookie(headers: dict) -> Optional[str]:
+    """
+    Extracts the session_id cookie from response headers.
+
+    Args:
+        headers (dict): Response headers.
+
+    Returns:
+        Optional[str]: The session ID, or None.
+    """
+    for name, value in headers.items():
+        if name.lower() == "set-cookie" and "session_id=" in value:
+            return value.split("session_id=", 1)[1].split(";", 1)[0]
+    return None
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """
+    Nearest-rank percentile of a list of samples.
+
+    Args:
+        samples (List[float]): The samples.
+        fraction (float): The percentile, between 0 and 1.
+
+    Returns:
+        float: The sample at that rank, 0 without samples.
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run_phase(url: str, clients: int, requests: int, work) -> Dict:
+    """
+    Runs `requests` calls of `work` spread over `clients` threads.
+
+    Args:
+        url (str): Base URL of the server.
+        clients (int): Number of concurrent client threads.
+        requests (int): Total number of calls.
+        work: Callable(client, i) -> bool, True on success.
+
+    Returns:
+        Dict: Counts, throughput and latency percentiles.
+    """
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    local = threading.local()
+
+    def one(i: int) -> None:
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = Client(url)
+        start = time.perf_counter()
+        try:
+            ok = work(client, i)
+        except (OSError, http.client.HTTPException):
+            ok = False
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            if not ok:
+                errors[0] += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(clients) as executor:
+        list(executor.map(one, range(requests)))
+    wall = time.perf_counter() - start
+    return {
+        "requests": requests,
+        "errors": errors[0],
+        "rps": requests / wall,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+
+def benchmark(url: str, clients: int, requests: int, tag: str) -> Dict:
+    """
+    Runs the login phase, then the profile phase with its sessions.
+
+    Args:
+        url (str): Base URL of the server.
+        clients (int): Number of concurrent client threads.
+        requests (int): Requests per phase.
+        tag (str): Makes the registered emails unique per run.
+
+    Returns:
+        Dict: Results keyed by phase name.
+    """
+    sessions = [None] * requests
+
+    def login(client: Client, i: int) -> bool:
+        email = "load{}-{}@hbtn.io".format(tag, i)
+        form = {"email": email, "password": "pw{}".format(i)}
+        status, _ = client.request("POST", "/users", form)
+        if status != 201:
+            return False
+        status, headers = client.request("POST", "/sessions", form)
+        sessions[i] = session_cookie(headers)
+        return status == 200
+
+    def profile(client: Client, i: int) -> bool:
+        cookie = sessions[i % len(sessions)]
+        status, _ = client.request("GET", "/profile", cookie=cookie)
+        return status == 200
+
+    results = {"login": run_phase(url, clients, requests, login)}
+    sessions = [s for s in sessions if s is not None] or [""]
+    results["profile"] = run_phase(url, clients, requests, profile)
+    return results
+
+
+def wait_until_up(url: str, timeout: float = 30.0) -> None:
+    """
+    Polls GET / until the server answers.
+
+    Args:
+        url (str): Base URL of the server.
+        timeout (float): Seconds to wait before giving up.
+
+    Raises:
+        RuntimeError: If the server does not answer in time.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if Client(url).request("GET", "/")[0] == 200:
+                return
+        except (OSError, http.client.HTTPException):
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("server at {} did not start".format(url))
+
+
+def run_server(name: str, port: int, workdir: str, rounds: int,
+               clients: int, requests: int) -> Dict:
+    """
+    Starts one server on a fresh database, benchmarks it and stops it.
+
+    Args:
+        name (str): Key of SERVERS.
+        port (int): Port to listen on.
+        workdir (str): Directory holding the server's database.
+        rounds (int): bcrypt cost factor for the server.
+        clients (int): Number of concurrent client threads.
+        requests (int): Requests per phase.
+
+    Returns:
+        Dict: Results keyed by phase name.
+    """
+    path = os.path.join(workdir, name + ".db")
+    env = dict(os.environ,
+               AUTH_DB_URL="sqlite:///" + path,
+               AUTH_ASYNC_DB_URL="sqlite+aiosqlite:///" + path,
+               BCRYPT_ROUNDS=str(rounds),
+               HASH_POOL_QUEUE=str(clients))
+    command = [part.format(port=port) for part in SERVERS[name]]
+    server = subprocess.Popen(command, cwd=HERE, env=env,
+                              stdout=subprocess.DEVNULL,
+                              stderr=subprocess.DEVNULL)
+    try:
+        url = "http://127.0.0.1:{}".format(port)
+        wait_until_up(url)
+        return benchmark(url, clients, requests, name)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def report(name: str, results: Dict) -> None:
+    """
+    Prints one line per phase.
+
+    Args:
+        name (str): Server name.
+        results (Dict): Results keyed by phase name.
+    """
+    for phase, stats in results.items():
+        print("{:<6} {:<8} {:>6} req {:>4} err {:>9.1f} req/s"
+              "  p50 {:>8.2f}ms  p99 {:>8.2f}ms".format(
+                  name, phase, stats["requests"], stats["errors"],
+                  stats["rps"], stats["p50_ms"], stats["p99_ms"]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=8,
+                        help="bcrypt cost factor of the servers started")
+    parser.add_argument("--url", help="benchmark this running server only")
+    args = parser.parse_args()
+
+    if args.url:
+        report("server", benchmark(args.url, args.clients, args.requests,
+                                   str(int(time.time()))))
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            for port, name in enumerate(SERVERS, start=5100):
+                report(name, run_server(name, port, tmp, args.rounds,
+                                        args.clients, args.requests))
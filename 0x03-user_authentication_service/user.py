@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
-"""SQLAlchemy ORM model definition for User."""
+"""SQLAlchemy ORM model definitions for User and UserSession."""
 
-from sqlalchemy import Column, Integer, String
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String
 from sqlalchemy.ext.declarative import declarative_base
 
 # Base class for all ORM models
@@ -16,8 +18,15 @@ class User(Base):
         id (int): Primary key, auto-incremented unique identifier for each user.
         email (str): User's email address, required and must be unique.
         hashed_password (str): The hashed version of the user's password.
-        session_id (str, optional): Session identifier for authentication.
+        session_id (str, optional): Legacy single session identifier, no
+            longer written; sessions live in `UserSession`.
         reset_token (str, optional): Token for password reset operations.
+
+    `reset_token` is looked up on every password reset, so it has a
+    unique index. `session_id` keeps the unique index it was given before
+    sessions moved out of this table; profile requests go through
+    `UserSession.token_hash` instead. Where the backend supports it
+    (SQLite, PostgreSQL) both indexes are partial and skip NULLs.
     """
     
     # Table name
@@ -30,3 +39,38 @@ class User(Base):
     hashed_password = Column(String(250), nullable=False, doc="Password stored in hashed format.")
     session_id = Column(String(128), nullable=True, doc="Session token for tracking user sessions.")
     reset_token = Column(String(128), nullable=True, doc="Token used for resetting the user's password.")
+
+    __table_args__ = (
+        Index("ix_users_session_id", session_id, unique=True,
+              sqlite_where=session_id.isnot(None),
+              postgresql_where=session_id.isnot(None)),
+        Index("ix_users_reset_token", reset_token, unique=True,
+              sqlite_where=reset_token.isnot(None),
+              postgresql_where=reset_token.isnot(None)),
+    )
+
+
+class UserSession(Base):
+    """
+    Represents the 'sessions' table: one row per logged-in device.
+
+    Only a SHA-256 digest of the session ID is stored, so the table cannot
+    be used to hijack sessions if it leaks.
+
+    Attributes:
+        id (int): Primary key.
+        user_id (int): ID of the user the session belongs to.
+        token_hash (str): Hex SHA-256 digest of the session ID.
+        created_at (datetime): When the session was created (UTC).
+        expires_at (datetime, optional): When the session stops being
+            valid (UTC), or `None` for sessions that never expire.
+    """
+
+    __tablename__ = 'sessions'
+
+    id = Column(Integer, primary_key=True, autoincrement=True, nullable=False)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'),
+                     nullable=False, index=True)
+    token_hash = Column(String(64), nullable=False, unique=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=True, index=True)